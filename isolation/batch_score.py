@@ -0,0 +1,282 @@
+"""This file contains the batch versions of the mobility heuristics, which
+score many game states at once with NumPy instead of one Python call per
+game state.
+
+The heuristics that can be scored in batches are registered as weighted
+sums of FEATURES (the mobility and second-order mobility of both players),
+e.g., `improved_score` is own_mobility - opp_mobility. The game states of a
+batch share the board size, and are encoded as arrays:
+
+    - `open_bytes`: one row per game state with the open squares packed
+      8 per byte (square `row * width + col` is bit `square % 8` of byte
+      `square // 8`), and
+    - `own` / `opp`: the squares of the player and of its opponent in every
+      game state (-1 if not placed yet).
+
+The mobility of a player is then the number of bits set in the packed knight
+mask of its square ANDed with the open squares, counted with a lookup table
+of the bit count of every byte.
+
+`score_batch()` scores a list of boards. `score_children()` scores the game
+states reached by each legal move of a game without building their boards,
+which is what `game_agent.CustomPlayer` uses to evaluate the leaves of the
+search in batches.
+"""
+
+import math
+
+import numpy as np
+
+from endgame import open_squares
+from isolation.bitboard import knight_tables
+from sample_players import null_score, open_move_score, improved_score
+
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+# Smallest batch scored with NumPy by `score_children()`
+NUMPY_MIN_BATCH = 16
+
+# (width, height) -> BatchTables; see `batch_tables()`
+_BATCH_TABLES = {}
+
+
+class BatchTables:
+    """Packed knight masks of a board size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+    """
+
+    def __init__(self, width, height):
+        self.squares = width * height
+        self.num_bytes = (self.squares + 7) // 8
+        masks = knight_tables(width, height)[1]
+        self.masks = np.frombuffer(b"".join(mask.to_bytes(self.num_bytes, "little")
+                                            for mask in masks),
+                                   dtype=np.uint8).reshape(self.squares, self.num_bytes)
+
+    def pack(self, open_masks):
+        """Pack a list of open-square bitmasks into an array of bytes."""
+        data = b"".join(mask.to_bytes(self.num_bytes, "little") for mask in open_masks)
+        return np.frombuffer(data, dtype=np.uint8).reshape(len(open_masks), self.num_bytes)
+
+    def unpack(self, packed):
+        """Unpack an array of bytes into one boolean per square."""
+        return np.unpackbits(packed, axis=-1, count=self.squares,
+                             bitorder="little").astype(bool)
+
+    def moves(self, open_bytes, squares):
+        """Return the packed legal moves from `squares` (every open square for
+        players not placed yet).
+        """
+        moves = self.masks[np.maximum(squares, 0)] & open_bytes
+        return np.where((squares < 0)[:, None], open_bytes, moves)
+
+    def mobility(self, open_bytes, squares):
+        """Return the number of legal moves from `squares`."""
+        return POPCOUNT[self.moves(open_bytes, squares)].sum(axis=1)
+
+    def second_mobility(self, open_bytes, squares):
+        """Return the total number of legal moves from the legal moves of
+        `squares`.
+        """
+        degrees = POPCOUNT[self.masks[None, :, :] & open_bytes[:, None, :]].sum(axis=2)
+        reachable = self.unpack(self.moves(open_bytes, squares))
+        return (degrees * reachable).sum(axis=1)
+
+
+def batch_tables(width, height):
+    """Return the BatchTables of a board size, computed once per size."""
+    tables = _BATCH_TABLES.get((width, height))
+    if tables is None:
+        tables = BatchTables(width, height)
+        _BATCH_TABLES[(width, height)] = tables
+    return tables
+
+
+# Features of a game state seen by a player, computed for every game state
+FEATURES = ("own_mobility", "opp_mobility", "own_second_mobility", "opp_second_mobility")
+
+# scalar heuristic -> weights of FEATURES; see `register_batch()`
+BATCH_WEIGHTS = {null_score: (0., 0., 0., 0.),
+                 open_move_score: (1., 0., 0., 0.),
+                 improved_score: (1., -1., 0., 0.)}
+
+
+def register_batch(score_fn, weights):
+    """Register the heuristic `score_fn` as the weighted sum of FEATURES with
+    `weights` (in non-terminal game states), so that it can be scored in
+    batches.
+    """
+    BATCH_WEIGHTS[score_fn] = tuple(float(weight) for weight in weights)
+
+
+def has_batch(score_fn):
+    """Test whether the heuristic can be scored in batches."""
+    return score_fn in BATCH_WEIGHTS
+
+
+def batch_features(tables, open_bytes, own, opp, second=True):
+    """Return the matrix of FEATURES (one row per game state); the second-order
+    mobility columns are left at 0 unless `second` is True.
+    """
+    features = np.zeros((len(own), len(FEATURES)))
+    features[:, 0] = tables.mobility(open_bytes, own)
+    features[:, 1] = tables.mobility(open_bytes, opp)
+    if second:
+        features[:, 2] = tables.second_mobility(open_bytes, own)
+        features[:, 3] = tables.second_mobility(open_bytes, opp)
+    return features
+
+
+def weighted_scores(features, player_active, weights):
+    """Return the weighted sum of the features of every game state, with -inf
+    for lost game states and +inf for won game states like the scalar
+    heuristics.
+    """
+    scores = features @ np.array(weights)
+    scores[player_active & (features[:, 0] == 0)] = -math.inf
+    scores[~player_active & (features[:, 1] == 0)] = math.inf
+    return scores
+
+
+def _square(game, player, width):
+    """Return the square of the player, or -1 if not placed yet."""
+    location = game.get_player_location(player)
+    return -1 if location is None else location[0] * width + location[1]
+
+
+def score_batch(boards, player, score_fn=improved_score):
+    """
+    Score many game states at once with the batch version of a heuristic.
+
+    Parameters
+    ----------
+    boards : list<`isolation.Board`>
+        The game states to score; all of them must have the same size and
+        players.
+
+    player : object
+        The player whose point of view is scored.
+
+    score_fn : callable (optional)
+        The heuristic (e.g., `sample_players.improved_score`); heuristics
+        without a batch version are called on every board.
+
+    Returns
+    -------
+    numpy.ndarray
+        The score of every game state, as `score_fn` would return it.
+    """
+    if not boards:
+        return np.zeros(0)
+    weights = BATCH_WEIGHTS.get(score_fn)
+    if weights is None:
+        return np.array([score_fn(board, player) for board in boards], dtype=float)
+    width, height = boards[0].width, boards[0].height
+    tables = batch_tables(width, height)
+    opponent = boards[0].get_opponent(player)
+    open_bytes = tables.pack([open_squares(board) for board in boards])
+    own = np.array([_square(board, player, width) for board in boards])
+    opp = np.array([_square(board, opponent, width) for board in boards])
+    player_active = np.array([board.active_player == player for board in boards])
+    features = batch_features(tables, open_bytes, own, opp, any(weights[2:]))
+    return weighted_scores(features, player_active, weights)
+
+
+def score_children(game, moves, player, score_fn=improved_score):
+    """
+    Score the game states reached by playing each of `moves` in the game,
+    without building their boards.
+
+    Batches smaller than NUMPY_MIN_BATCH (e.g., the children of a node in the
+    middle of the game) are scored with Python integer bitmasks, which is
+    faster than NumPy for a handful of game states; larger batches (e.g.,
+    the placement moves) are scored with NumPy.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The parent game state.
+
+    moves : list<(int, int)>
+        Legal moves of the player holding initiative in the game.
+
+    player : object
+        The player whose point of view is scored.
+
+    score_fn : callable (optional)
+        The heuristic; it must have a batch version (see `has_batch()`).
+
+    Returns
+    -------
+    list<float>
+        The score of the game state reached by every move.
+    """
+    width, height = game.width, game.height
+    weights = BATCH_WEIGHTS[score_fn]
+    second = any(weights[2:])
+    open_mask = open_squares(game)
+    squares = [row * width + col for row, col in moves]
+    other = _square(game, game.inactive_player, width)
+    player_moves = player == game.active_player
+
+    if len(squares) >= NUMPY_MIN_BATCH:
+        tables = batch_tables(width, height)
+        open_bytes = tables.pack([open_mask & ~(1 << square) for square in squares])
+        mover = np.array(squares)
+        others = np.full(len(squares), other)
+        # the player holding initiative in the children is the one who didn't move
+        if player_moves:
+            features = batch_features(tables, open_bytes, mover, others, second)
+        else:
+            features = batch_features(tables, open_bytes, others, mover, second)
+        player_active = np.full(len(squares), not player_moves)
+        return weighted_scores(features, player_active, weights).tolist()
+
+    masks = knight_tables(width, height)[1]
+    w_own, w_opp, w_own_second, w_opp_second = weights
+    scores = []
+    for square in squares:
+        child_open = open_mask & ~(1 << square)
+        mover_moves = masks[square] & child_open
+        other_moves = masks[other] & child_open if other >= 0 else child_open
+        mover_mobility = mover_moves.bit_count()
+        other_mobility = other_moves.bit_count()
+        if player_moves:
+            own_mobility, opp_mobility = mover_mobility, other_mobility
+        else:
+            own_mobility, opp_mobility = other_mobility, mover_mobility
+        if player_moves and not opp_mobility:
+            scores.append(math.inf)
+        elif not player_moves and not own_mobility:
+            scores.append(-math.inf)
+        else:
+            score = w_own * own_mobility + w_opp * opp_mobility
+            if second:
+                mover_second = _second_mobility(masks, mover_moves, child_open)
+                other_second = _second_mobility(masks, other_moves, child_open)
+                if player_moves:
+                    score += w_own_second * mover_second + w_opp_second * other_second
+                else:
+                    score += w_own_second * other_second + w_opp_second * mover_second
+            scores.append(score)
+    return scores
+
+
+def _second_mobility(masks, moves, open_mask):
+    """Return the total number of open squares one knight move away from each
+    square of `moves`.
+    """
+    total = 0
+    while moves:
+        bit = moves & -moves
+        total += (masks[bit.bit_length() - 1] & open_mask).bit_count()
+        moves ^= bit
+    return total
@@ -0,0 +1,180 @@
+"""
+This file contains test cases for the alternate `isolation.Board`
+implementations and the board-level search support (move generation,
+make/unmake, hashing, etc.). Each implementation is checked against the
+reference `isolation.Board` by replaying the same random games on both.
+"""
+import random
+import unittest
+
+import isolation
+
+from isolation.isolation import knight_neighbors
+from symmetry import canonicalize, transforms
+
+
+class KnightNeighborsTest(unittest.TestCase):
+
+    def test_table(self):
+        """ The neighbor table lists the legal knight moves of every cell """
+        for width, height in [(7, 7), (5, 6), (9, 4), (1, 1)]:
+            board = isolation.Board("p1", "p2", width, height)
+            table = knight_neighbors(width, height)
+            for r in range(height):
+                for c in range(width):
+                    expected = [(r + dr, c + dc) for dr, dc in isolation.isolation.DIRECTIONS
+                                if board.move_is_legal((r + dr, c + dc))]
+                    self.assertEqual(list(table[r][c]), expected)
+
+    def test_shared(self):
+        """ Boards of the same size share a single neighbor table """
+        board = isolation.Board("p1", "p2")
+        self.assertIs(board.__neighbors__, isolation.Board("p3", "p4").__neighbors__)
+        self.assertIs(board.__neighbors__, board.copy().__neighbors__)
+        self.assertIsNot(board.__neighbors__, isolation.Board("p1", "p2", 5, 5).__neighbors__)
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def assertSameState(self, board, bitboard):
+        for player in (board.active_player, board.inactive_player):
+            self.assertEqual(board.get_legal_moves(player),
+                             bitboard.get_legal_moves(player))
+            self.assertEqual(board.get_player_location(player),
+                             bitboard.get_player_location(player))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+            self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+            self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+        self.assertEqual(board.get_blank_spaces(), bitboard.get_blank_spaces())
+        self.assertEqual(board.to_string(), bitboard.to_string())
+        self.assertEqual(board.move_count, bitboard.move_count)
+
+    def test_matches_board(self):
+        """ BitBoard agrees with Board along random games """
+        rng = random.Random(0)
+        for width, height in [(7, 7), (5, 6), (9, 4)]:
+            for _ in range(10):
+                board = isolation.Board("p1", "p2", width, height)
+                bitboard = isolation.BitBoard("p1", "p2", width, height)
+                self.assertSameState(board, bitboard)
+                while board.get_legal_moves():
+                    move = rng.choice(board.get_legal_moves())
+                    self.assertTrue(bitboard.move_is_legal(move))
+                    board.apply_move(move)
+                    bitboard.apply_move(move)
+                    self.assertSameState(board, bitboard)
+
+    def test_forecast_move(self):
+        """ BitBoard.forecast_move does not change the calling board """
+        bitboard = isolation.BitBoard("p1", "p2")
+        bitboard.apply_move((2, 3))
+        bitboard.apply_move((0, 5))
+        before = bitboard.to_string()
+        new_board = bitboard.forecast_move((1, 1))
+        self.assertIsInstance(new_board, isolation.BitBoard)
+        self.assertEqual(before, bitboard.to_string())
+        self.assertNotEqual(before, new_board.to_string())
+
+
+class PushPopTest(unittest.TestCase):
+
+    def check_push_pop(self, board_cls):
+        rng = random.Random(1)
+        for _ in range(10):
+            board = board_cls("p1", "p2", 7, 7)
+            snapshots = []
+            while board.get_legal_moves():
+                snapshots.append((board.to_string(), board.move_count,
+                                  board.active_player,
+                                  board.get_legal_moves("p1"),
+                                  board.get_legal_moves("p2")))
+                board.push_move(rng.choice(board.get_legal_moves()))
+            while snapshots:
+                board.pop_move()
+                self.assertEqual(snapshots.pop(),
+                                 (board.to_string(), board.move_count,
+                                  board.active_player,
+                                  board.get_legal_moves("p1"),
+                                  board.get_legal_moves("p2")))
+
+    def test_board(self):
+        """ Board.pop_move reverts Board.push_move """
+        self.check_push_pop(isolation.Board)
+
+    def test_bitboard(self):
+        """ BitBoard.pop_move reverts BitBoard.push_move """
+        self.check_push_pop(isolation.BitBoard)
+
+
+class ZobristTest(unittest.TestCase):
+
+    def test_transpositions(self):
+        """ The hash depends on the game state, not on the move order """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            first = board_cls("p1", "p2")
+            for move in [(1, 2), (6, 6), (3, 3), (4, 5), (2, 5), (6, 4), (0, 4), (4, 3)]:
+                first.apply_move(move)
+            second = board_cls("p1", "p2")
+            for move in [(2, 5), (6, 6), (3, 3), (4, 5), (1, 2), (6, 4), (0, 4), (4, 3)]:
+                second.apply_move(move)
+            third = board_cls("p1", "p2")
+            for move in [(1, 2), (6, 6), (3, 3), (4, 5), (2, 5), (6, 4), (4, 4), (4, 3)]:
+                third.apply_move(move)
+            self.assertEqual(first.to_string(), second.to_string())
+            self.assertEqual(first.zobrist_hash, second.zobrist_hash)
+            self.assertNotEqual(first.zobrist_hash, third.zobrist_hash)
+
+    def test_incremental(self):
+        """ The hash is the same on both boards and is restored by pop_move """
+        rng = random.Random(3)
+        for _ in range(10):
+            board = isolation.Board("p1", "p2")
+            bitboard = isolation.BitBoard("p1", "p2")
+            hashes = set()
+            while board.get_legal_moves():
+                self.assertEqual(board.zobrist_hash, bitboard.zobrist_hash)
+                self.assertNotIn(board.zobrist_hash, hashes)
+                hashes.add(board.zobrist_hash)
+                move = rng.choice(board.get_legal_moves())
+                board.push_move(move)
+                bitboard.push_move(move)
+            while board.move_count:
+                board.pop_move()
+                bitboard.pop_move()
+                self.assertEqual(board.zobrist_hash, bitboard.zobrist_hash)
+                self.assertIn(board.zobrist_hash, hashes)
+            self.assertEqual(board.zobrist_hash, 0)
+
+
+class SymmetryTest(unittest.TestCase):
+
+    def test_canonicalize(self):
+        """ Symmetric boards have the same canonical form """
+        rng = random.Random(4)
+        for width, height in [(7, 7), (5, 6)]:
+            for _ in range(10):
+                moves = []
+                board = isolation.BitBoard("p1", "p2", width, height)
+                for _ in range(rng.randint(0, 12)):
+                    if not board.get_legal_moves():
+                        break
+                    moves.append(rng.choice(board.get_legal_moves()))
+                    board.apply_move(moves[-1])
+                form, transform = canonicalize(board)
+                self.assertEqual(len(transforms(width, height)), 8 if width == height else 4)
+                for symmetry in transforms(width, height):
+                    image = isolation.Board("p1", "p2", width, height)
+                    for move in moves:
+                        image.apply_move(symmetry.apply(move))
+                    image_form, image_transform = canonicalize(image)
+                    self.assertEqual(form, image_form)
+                    # moves are remapped through the canonical form
+                    self.assertEqual(
+                        sorted(image_transform.apply(move) for move in image.get_legal_moves()),
+                        sorted(transform.apply(move) for move in board.get_legal_moves()))
+                    for move in image.get_legal_moves():
+                        self.assertEqual(image_transform.revert(image_transform.apply(move)), move)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+"""This file contains the endgame solver used by `game_agent.CustomPlayer` to
+play separated endgames exactly.
+
+Once no open square can be reached by both players, the players can no
+longer interfere with each other and the game reduces to two independent
+longest-path problems: the player holding initiative wins if and only if
+the longest knight path it can walk from its location is longer than the
+longest path of its opponent.
+
+Separation is detected by a flood fill over the knight moves of the open
+squares. The length of the longest path of each player is then bounded
+cheaply (a greedy walk for the lower bound, the count of open squares of
+each color for the upper bound) and, when the bounds do not settle the
+game, computed exactly by a depth-first search memoized on the pair
+(square, open squares) within a budget of nodes.
+"""
+
+from isolation import BitBoard
+from isolation.bitboard import knight_tables
+from isolation.isolation import DIRECTIONS
+
+
+class _BudgetExceeded(Exception):
+    """Raised when an exact longest-path search visits too many nodes."""
+    pass
+
+
+def open_squares(game):
+    """Return the open squares of the game as an integer with the bit
+    `row * width + col` set for every open cell (row, col).
+    """
+    if isinstance(game, BitBoard):
+        return ~game.__blocked__ & ((1 << (game.width * game.height)) - 1)
+    squares = 0
+    for row, col in game.get_blank_spaces():
+        squares |= 1 << (row * game.width + col)
+    return squares
+
+
+def _bits(squares):
+    """Yield the index of every bit set in `squares`."""
+    while squares:
+        bit = squares & -squares
+        yield bit.bit_length() - 1
+        squares ^= bit
+
+
+def knight_shifts(width, height):
+    """Return the (shift, sources) pairs of the knight moves of a board of the
+    given size: a move shifts a square's bit by `shift` bits (right shift if
+    negative), and is on the board for the squares set in `sources`.
+    """
+    shifts = []
+    for dr, dc in DIRECTIONS:
+        sources = 0
+        for r in range(height):
+            for c in range(width):
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    sources |= 1 << (r * width + c)
+        shifts.append((dr * width + dc, sources))
+    return tuple(shifts)
+
+
+def flood_fill(shifts, square, open_mask, stop=0):
+    """Return the open squares reachable by knight moves from `square` (not
+    including `square` itself), moving the whole frontier at once with the
+    bit shifts of `knight_shifts()`. The fill stops early, returning a partial
+    region, as soon as it reaches a square of `stop`.
+    """
+    region = 0
+    frontier = 1 << square
+    while frontier and not region & stop:
+        reached = 0
+        for shift, sources in shifts:
+            if shift > 0:
+                reached |= (frontier & sources) << shift
+            else:
+                reached |= (frontier & sources) >> -shift
+        frontier = reached & open_mask & ~region
+        region |= frontier
+    return region
+
+
+class EndgameSolver:
+    """Decide separated endgames by comparing the longest paths of the players.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        The maximum number of nodes visited by the exact longest-path
+        search of a single call to `solve()`; positions that need more
+        nodes are left undecided.
+
+    max_entries : int (optional)
+        The maximum number of longest-path lengths remembered; the memo is
+        cleared when it grows larger.
+    """
+
+    def __init__(self, max_nodes=5000, max_entries=2**18):
+        self.max_nodes = max_nodes
+        self.max_entries = max_entries
+        self.size = None
+        self.masks = ()
+        self.shifts = ()
+        self.colors = 0
+        self.memo = {}
+        self.budget = 0
+        self.probes = 0
+        self.separated = 0
+        self.solved = 0
+        self.nodes = 0
+
+    def set_size(self, width, height):
+        """Load the move tables of the board size, forgetting the memoized
+        lengths when the size changes.
+        """
+        if self.size != (width, height):
+            self.size = (width, height)
+            self.masks = knight_tables(width, height)[1]
+            self.shifts = knight_shifts(width, height)
+            self.colors = sum(1 << (r * width + c) for r in range(height)
+                              for c in range(width) if (r + c) % 2 == 0)
+            self.memo = {}
+
+    def solve(self, game):
+        """Decide the game if the players are separated.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state to decide.
+
+        Returns
+        -------
+        (bool, (int, int)) or None
+            Whether the active player wins, and the move it should play
+            ((-1, -1) if it has no legal moves); None if the players are not
+            separated or the position could not be decided within the node
+            budget.
+        """
+        self.probes += 1
+        active = game.get_player_location(game.active_player)
+        inactive = game.get_player_location(game.inactive_player)
+        if active is None or inactive is None:
+            return None
+
+        self.set_size(game.width, game.height)
+        width = game.width
+        masks = self.masks
+        active = active[0] * width + active[1]
+        inactive = inactive[0] * width + inactive[1]
+        open_mask = open_squares(game)
+        inactive_moves = masks[inactive] & open_mask
+        active_region = flood_fill(self.shifts, active, open_mask, stop=inactive_moves)
+        if active_region & inactive_moves:
+            return None
+        self.separated += 1
+        inactive_region = flood_fill(self.shifts, inactive, open_mask)
+
+        active_lower, move = self.greedy_path(active, active_region)
+        inactive_lower, _ = self.greedy_path(inactive, inactive_region)
+        active_upper = self.upper_bound(active, active_region)
+        inactive_upper = self.upper_bound(inactive, inactive_region)
+
+        self.budget = self.max_nodes
+        try:
+            if active_lower <= inactive_upper and active_upper > inactive_lower:
+                if len(self.memo) > self.max_entries:
+                    self.memo = {}
+                active_length, move = self.longest_path(active, active_region)
+                inactive_length = self.longest(inactive, inactive_region)
+                active_lower = active_length
+                inactive_upper = inactive_length
+        except _BudgetExceeded:
+            return None
+        finally:
+            self.nodes += self.max_nodes - self.budget
+
+        self.solved += 1
+        if move is None:
+            return (False, (-1, -1))
+        return (active_lower > inactive_upper, (move // width, move % width))
+
+    def greedy_path(self, square, region):
+        """Walk from `square` over `region`, always moving to the square with
+        the fewest onward moves (Warnsdorff's rule), and return the length of
+        the walk and its first square (None for an empty walk).
+        """
+        masks = self.masks
+        length = 0
+        first = None
+        moves = masks[square] & region
+        while moves:
+            square = min(_bits(moves),
+                         key=lambda index: (masks[index] & region).bit_count())
+            region &= ~(1 << square)
+            moves = masks[square] & region
+            if first is None:
+                first = square
+            length += 1
+        return (length, first)
+
+    def upper_bound(self, square, region):
+        """Return an upper bound of the length of the paths from `square` over
+        `region`: knight moves alternate colors, so a path can't use many more
+        squares of one color than of the other.
+        """
+        same = (region & (self.colors if (1 << square) & self.colors else ~self.colors)).bit_count()
+        other = region.bit_count() - same
+        return min(2 * other, 2 * same + 1)
+
+    def longest_path(self, square, region):
+        """Return the length of the longest path from `square` over `region`
+        and its first square (None for an empty path).
+        """
+        best, first = 0, None
+        for index in _bits(self.masks[square] & region):
+            length = 1 + self.longest(index, region & ~(1 << index))
+            if length > best:
+                best, first = length, index
+        return (best, first)
+
+    def longest(self, square, region):
+        """Return the length of the longest path from `square` over `region`."""
+        key = (square, region)
+        best = self.memo.get(key)
+        if best is not None:
+            return best
+        self.budget -= 1
+        if self.budget < 0:
+            raise _BudgetExceeded()
+        bound = self.upper_bound(square, region)
+        best = 0
+        for index in _bits(self.masks[square] & region):
+            length = 1 + self.longest(index, region & ~(1 << index))
+            if length > best:
+                best = length
+                if best >= bound:
+                    break
+        self.memo[key] = best
+        return best
+
+    def stats(self):
+        """Return the solver counters as a dictionary."""
+        return {"probes": self.probes, "separated": self.separated,
+                "solved": self.solved, "nodes": self.nodes,
+                "entries": len(self.memo)}
@@ -10,6 +10,23 @@ import random
 import pdb
 import math
 
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from parallel import RootSplitSearch
+from endgame import EndgameSolver
+from opening_book import OpeningBook
+from symmetry import canonicalize, canonical_hash
+from batch_score import has_batch, register_batch, score_children
+
+# Zobrist hashes identify states by the board contents, so the results the
+# agent stores while playing as the second player are salted with this key
+# to keep them apart from the ones it stores while playing first.
+PLAYER_2_HASH_SALT = 0x6a09e667f3bcc908
+
+# Canonical forms identify states from the point of view of the player holding
+# initiative, so their keys are salted according to the player holding
+# initiative (the agent, or its opponent) to keep their results apart.
+CANONICAL_HASH_SALTS = (0xbb67ae8584caa73b, 0x3c6ef372fe94f82b)
+
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
@@ -161,6 +178,9 @@ def custom_score(game, player):
     # return favor_run_away_heuristic(game, player)
     return look_ahead_heuristic(game, player)
 
+register_batch(look_ahead_heuristic, (1., -1., 1., -1.))
+register_batch(custom_score, (1., -1., 1., -1.))
+
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
     and a depth-limited minimax algorithm with alpha-beta pruning. You must
@@ -182,31 +202,112 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
+    method : {'minimax', 'alphabeta', 'pvs'} (optional)
         The name of the search method to use in get_move().
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    make_unmake : boolean (optional)
+        Flag indicating whether to expand nodes by applying and undoing moves
+        in place with `Board.push_move()`/`Board.pop_move()` (True) or by
+        copying the board with `Board.forecast_move()` (False).
+
+    tt_size : int (optional)
+        The number of entries of the transposition table used by alphabeta
+        search to reuse results between iterations and turns; 0 disables
+        the table.
+
+    symmetric_plies : int (optional)
+        The game states with fewer than this number of moves played are stored in the
+        transposition table under the key of their canonical form (see
+        `symmetry.canonicalize()`), so that symmetric game states share their
+        entries; 0 stores every game state under its own key.
+
+    batch_eval : boolean (optional)
+        Flag indicating whether alphabeta and principal variation search score
+        the children of the nodes at depth 1 all at once with the batch version
+        of the heuristic (see `batch_score.py`), when it has one. Leaves scored
+        in a batch are not probed by the endgame solver.
+
+    move_ordering : callable (optional)
+        A factory (e.g., the `move_ordering.MoveOrdering` class) for the object
+        used by alphabeta search to choose the order in which moves are
+        searched; None searches the moves in the order they are generated.
+
+    aspiration_window : float (optional)
+        Half-width of the window around the score of the previous iteration
+        used by principal variation search ('pvs') during iterative deepening.
+
+    workers : int (optional)
+        The number of worker processes used to search the root moves in
+        parallel (see `parallel.RootSplitSearch`); 1 searches in the calling
+        process. Call close() to stop the workers when the agent is no longer
+        needed.
+
+    endgame : callable (optional)
+        A factory (e.g., the `endgame.EndgameSolver` class) for the solver used
+        to play exactly once the players are separated, and to evaluate the
+        separated positions reached by alphabeta search; None disables it.
+
+    opening_book : str (optional)
+        The path of an opening book file (see `opening_book.py`) probed for
+        the first moves of the game before searching; None disables it.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 make_unmake=False, tt_size=0, move_ordering=None,
+                 aspiration_window=2., workers=1, endgame=None, opening_book=None,
+                 symmetric_plies=0, batch_eval=False):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.make_unmake = make_unmake
+        self.tt_size = tt_size
+        self.transposition_table = TranspositionTable(tt_size) if tt_size else None
+        self.hash_salt = 0
+        self.symmetric_plies = symmetric_plies
+        self.batch_eval = batch_eval
+        self.move_ordering = move_ordering() if move_ordering is not None else None
+        self.aspiration_window = aspiration_window
+        self.aspiration_score = None
+        self.workers = workers
+        self.root_split = RootSplitSearch(workers) if workers > 1 else None
+        self.endgame = endgame() if endgame is not None else None
+        self.opening_book = OpeningBook(opening_book) if opening_book is not None else None
+
+    def __getstate__(self):
+        """Pickle the agent without its timer, worker pool and transposition
+        table; an unpickled agent starts with an empty table.
+        """
+        state = self.__dict__.copy()
+        state.update(time_left=None, root_split=None, transposition_table=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.tt_size:
+            self.transposition_table = TranspositionTable(self.tt_size)
+
+    def close(self):
+        """Stop the worker processes of parallel search, if any."""
+        if self.root_split is not None:
+            self.root_split.close()
+            self.root_split = None
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
         result before the time limit expires.
 
         This function must perform iterative deepening if self.iterative=True,
-        and it must use the search method (minimax or alphabeta) corresponding
-        to the self.method value.
+        and it must use the search method (minimax, alphabeta or pvs)
+        corresponding to the self.method value.
 
         **********************************************************************
         NOTE: If time_left < 0 when this function returns, the agent will
@@ -241,20 +342,122 @@ class CustomPlayer:
         if not legal_moves:
             return (-1, -1)
 
+        if self.opening_book is not None:
+            move = self.opening_book.probe(game)
+            if move in legal_moves:
+                return move
+
+        if self.endgame is not None:
+            solved = self.endgame.solve(game)
+            if solved is not None:
+                return solved[1]
+
+        if self.root_split is not None and len(legal_moves) > 1:
+            return self.root_split.get_move(self, game, legal_moves, time_left)
+
+        self.new_search(game)
+        ordering = self.move_ordering
+
         move = None
         try:
-            algorithm_name = getattr(self, self.method) # Method selected to get move (minimax, alphabeta)
+            algorithm_name = getattr(self, self.method) # Method selected to get move (minimax, alphabeta, pvs)
             if self.iterative:
                 depth = 1 # Depth used for iterative deepening
                 while True:
+                    if ordering is not None:
+                        ordering.new_iteration(game)
                     _, move = algorithm_name(game, depth)
                     depth += 1
             else:
+                if ordering is not None:
+                    ordering.new_iteration(game)
                 _, move = algorithm_name(game, self.search_depth)
         except Timeout:
             return move # A timeout has occurred, return best move so far
         return move
 
+    def new_search(self, game):
+        """Reset the search state kept between turns before searching the
+        root game state.
+        """
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+            self.hash_salt = PLAYER_2_HASH_SALT if game.move_count % 2 else 0
+        if self.move_ordering is not None:
+            self.move_ordering.new_search()
+        self.aspiration_score = None
+
+    def solve_endgame(self, game):
+        """Return the exact score/move tuple of a separated game state, or None
+        if the endgame solver can't decide the game state.
+        """
+        solved = self.endgame.solve(game)
+        if solved is None:
+            return None
+        active_wins, move = solved
+        if active_wins == (game.active_player == self):
+            return (float('inf'), move)
+        return (float('-inf'), move)
+
+    def search_root_moves(self, game, moves, time_left):
+        """Search a subset of the root moves with the search method of the agent
+        (iteratively deepening if self.iterative=True) until the timer expires.
+        This is the search run by each worker process of parallel search.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The root game state, with the agent holding initiative.
+
+        moves : list<(int, int)>
+            The subset of the legal moves of the root to search.
+
+        time_left : callable
+            A function that returns the number of milliseconds left for the
+            search.
+
+        Returns
+        -------
+        list<(float, (int, int))>
+            The best score/move tuple among `moves` for each completed depth
+            (i.e., the i-th tuple was found searching to depth i + 1 for
+            iterative deepening).
+        """
+        self.time_left = time_left
+        self.new_search(game)
+        maximize_play = getattr(self, self.method + '_maximize_play')
+
+        results = []
+        depth = 1 if self.iterative else self.search_depth
+        try:
+            while True:
+                if self.move_ordering is not None:
+                    self.move_ordering.new_iteration(game)
+                if self.method == 'minimax':
+                    results.append(maximize_play(game, moves, depth))
+                else:
+                    results.append(maximize_play(game, moves, depth, float('-inf'), float('inf')))
+                if not self.iterative:
+                    break
+                depth += 1
+        except Timeout:
+            pass
+        return results
+
+    def search_successor(self, search_fn, game, move, *args):
+        """Call `search_fn` on the game state reached by applying `move` to
+        `game`, passing `args` as the remaining search parameters. The board
+        is restored before returning (even when the search times out) if the
+        move is applied in place.
+        """
+        if not self.make_unmake:
+            return search_fn(game.forecast_move(move), *args)
+        game.push_move(move)
+        try:
+            return search_fn(game, *args)
+        finally:
+            game.pop_move()
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -304,7 +507,7 @@ class CustomPlayer:
         """
         highest_score, selected_move = (float('-inf'), (-1, -1))
         for move in legal_moves:
-            score, _ = self.minimax(game.forecast_move(move), depth - 1, False)
+            score, _ = self.search_successor(self.minimax, game, move, depth - 1, False)
             highest_score, selected_move = max((highest_score, selected_move), (score, move))
         return (highest_score, selected_move)
 
@@ -313,7 +516,7 @@ class CustomPlayer:
         """
         lowest_score, selected_move = (float('inf'), (-1, -1))
         for move in legal_moves:
-            score, _ = self.minimax(game.forecast_move(move), depth - 1)
+            score, _ = self.search_successor(self.minimax, game, move, depth - 1)
             lowest_score, selected_move = min((lowest_score, selected_move), (score, move))
         return (lowest_score, selected_move)
 
@@ -352,6 +555,16 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        ordering = self.move_ordering
+        if ordering is not None:
+            ply = ordering.enter(game)
+
+        # Separated game states are scored exactly
+        if self.endgame is not None:
+            solved = self.solve_endgame(game)
+            if solved is not None:
+                return solved
+
         # Return heuristic value of game when search has reached max depth
         if depth == 0:
             # Note: No need to return move, as the max/min players keep track of them
@@ -362,36 +575,315 @@ class CustomPlayer:
         if not legal_moves:
             return (game.utility(self), (-1, -1))
 
+        if ordering is not None:
+            legal_moves = ordering.order(legal_moves, ply)
+
         # Maximize/minimize play accordingly
-        if maximizing_player:
-            return self.alphabeta_maximize_play(game, legal_moves, depth, alpha, beta)
+        if depth == 1 and self.batch_eval and has_batch(self.score):
+            play = self.batch_maximize_play if maximizing_player else self.batch_minimize_play
+        elif maximizing_player:
+            play = self.alphabeta_maximize_play
         else:
-            return self.alphabeta_minimize_play(game, legal_moves, depth, alpha, beta)
+            play = self.alphabeta_minimize_play
+
+        if self.transposition_table is not None:
+            return self.search_with_table(play, game, legal_moves, depth, alpha, beta)
+        return play(game, legal_moves, depth, alpha, beta)
+
+    def search_with_table(self, play, game, legal_moves, depth, alpha, beta):
+        """Search a node with the `play` function (e.g., alphabeta_maximize_play)
+        backed by the transposition table. Returns the stored score/move tuple when it
+        was searched deep enough to settle the (alpha, beta) window, otherwise searches
+        the stored best move first and stores the result. The moves of canonical
+        entries are stored in the canonical form of the game state
+        """
+        transform = None
+        if game.move_count < self.symmetric_plies:
+            form, transform = canonicalize(game)
+            key = canonical_hash(form, game.width, game.height) ^ \
+                CANONICAL_HASH_SALTS[game.active_player != self]
+        else:
+            key = game.zobrist_hash ^ self.hash_salt
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            entry_depth, bound, score, move = entry
+            if transform is not None:
+                move = transform.revert(move)
+            if entry_depth >= depth and (bound == EXACT or
+                                         (bound == LOWER and score >= beta) or
+                                         (bound == UPPER and score <= alpha)):
+                return (score, move)
+            if move in legal_moves:
+                legal_moves.remove(move)
+                legal_moves.insert(0, move)
+
+        score, move = play(game, legal_moves, depth, alpha, beta)
+
+        if score <= alpha:
+            bound = UPPER
+        elif score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        stored_move = move if transform is None else transform.apply(move)
+        self.transposition_table.store(key, depth, bound, score, stored_move)
+        return (score, move)
 
     def alphabeta_maximize_play(self, game, legal_moves, depth, alpha, beta):
         """Alphabeta maximizer player. Returns the highest score/move tuple found in game
-        pruning the search tree when possible
+        pruning the search tree when possible (the score is an upper bound of the
+        true value when it is not above alpha)
         """
+        ordering = self.move_ordering
         highest_score, selected_move = (float('-inf'), (-1, -1))
-        for move in legal_moves:
-            score, _ = self.alphabeta(game.forecast_move(move), depth - 1, alpha, beta, False)
+        for index, move in enumerate(legal_moves):
+            score, _ = self.search_successor(self.alphabeta, game, move, depth - 1, alpha, beta, False)
+            if score > highest_score:
+                highest_score, selected_move = score, move
             if score > alpha:
                 alpha = score
-                highest_score, selected_move = score, move
+                if ordering is not None:
+                    ordering.update_pv(game, move)
             if alpha >= beta:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
                 break
         return (highest_score, selected_move)
 
     def alphabeta_minimize_play(self, game, legal_moves, depth, alpha, beta):
         """Alphabeta minimizer player. Returns the lowest score/move tuple found in game
-        pruning the search tree when possible
+        pruning the search tree when possible (the score is a lower bound of the
+        true value when it is not below beta)
         """
+        ordering = self.move_ordering
         lowest_score, selected_move = (float('inf'), (-1, -1))
-        for move in legal_moves:
-            score, _ = self.alphabeta(game.forecast_move(move), depth - 1, alpha, beta, True)
+        for index, move in enumerate(legal_moves):
+            score, _ = self.search_successor(self.alphabeta, game, move, depth - 1, alpha, beta, True)
+            if score < lowest_score:
+                lowest_score, selected_move = score, move
+            if score < beta:
+                beta = score
+                if ordering is not None:
+                    ordering.update_pv(game, move)
+            if beta <= alpha:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
+                break
+        return (lowest_score, selected_move)
+
+    def batch_maximize_play(self, game, legal_moves, depth, alpha, beta):
+        """Maximizer player of the nodes at depth 1: scores all the children at once
+        with the batch version of the heuristic, and returns the highest score/move
+        tuple found like alphabeta_maximize_play
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+        ordering = self.move_ordering
+        if ordering is not None:
+            ordering.enter_leaves(game)
+        scores = score_children(game, legal_moves, self, self.score)
+        highest_score, selected_move = (float('-inf'), (-1, -1))
+        for index, (move, score) in enumerate(zip(legal_moves, scores)):
+            if score > highest_score:
+                highest_score, selected_move = score, move
+            if score > alpha:
+                alpha = score
+                if ordering is not None:
+                    ordering.update_pv(game, move)
+            if alpha >= beta:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
+                break
+        return (highest_score, selected_move)
+
+    def batch_minimize_play(self, game, legal_moves, depth, alpha, beta):
+        """Minimizer player of the nodes at depth 1: scores all the children at once
+        with the batch version of the heuristic, and returns the lowest score/move
+        tuple found like alphabeta_minimize_play
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+        ordering = self.move_ordering
+        if ordering is not None:
+            ordering.enter_leaves(game)
+        scores = score_children(game, legal_moves, self, self.score)
+        lowest_score, selected_move = (float('inf'), (-1, -1))
+        for index, (move, score) in enumerate(zip(legal_moves, scores)):
+            if score < lowest_score:
+                lowest_score, selected_move = score, move
             if score < beta:
                 beta = score
+                if ordering is not None:
+                    ordering.update_pv(game, move)
+            if beta <= alpha:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
+                break
+        return (lowest_score, selected_move)
+
+    def pvs(self, game, depth):
+        """Search the game tree with principal variation search, starting with an
+        aspiration window centered on the score of the previous iteration of
+        iterative deepening. When the score falls outside of the window, the
+        failing side of the window is opened and the search is repeated.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        Returns
+        -------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        alpha, beta = float('-inf'), float('inf')
+        guess = self.aspiration_score
+        if guess is not None and not math.isinf(guess):
+            alpha, beta = guess - self.aspiration_window, guess + self.aspiration_window
+
+        while True:
+            score, move = self.principal_variation_search(game, depth, alpha, beta)
+            if score <= alpha and alpha != float('-inf'):
+                alpha = float('-inf')
+            elif score >= beta and beta != float('inf'):
+                beta = float('inf')
+            else:
+                break
+
+        self.aspiration_score = score
+        return (score, move)
+
+    def principal_variation_search(self, game, depth, alpha=float("-inf"), beta=float("inf"),
+                                   maximizing_player=True):
+        """Implement principal variation search (NegaScout): the first move of each
+        node is searched with the (alpha, beta) window, and the remaining moves with
+        a null window that only tells whether they beat the best move so far; moves
+        that do are searched again with the full window.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha : float
+            Alpha limits the lower bound of search on minimizing layers
+
+        beta : float
+            Beta limits the upper bound of search on maximizing layers
+
+        maximizing_player : bool
+            Flag indicating whether the current search depth corresponds to a
+            maximizing layer (True) or a minimizing layer (False)
+
+        Returns
+        -------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+        ordering = self.move_ordering
+        if ordering is not None:
+            ply = ordering.enter(game)
+
+        # Separated game states are scored exactly
+        if self.endgame is not None:
+            solved = self.solve_endgame(game)
+            if solved is not None:
+                return solved
+
+        # Return heuristic value of game when search has reached max depth
+        if depth == 0:
+            return (self.score(game, self), None)
+
+        # Verify if there are any available legal moves
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            return (game.utility(self), (-1, -1))
+
+        if ordering is not None:
+            legal_moves = ordering.order(legal_moves, ply)
+
+        # Maximize/minimize play accordingly
+        if depth == 1 and self.batch_eval and has_batch(self.score):
+            play = self.batch_maximize_play if maximizing_player else self.batch_minimize_play
+        elif maximizing_player:
+            play = self.pvs_maximize_play
+        else:
+            play = self.pvs_minimize_play
+
+        if self.transposition_table is not None:
+            return self.search_with_table(play, game, legal_moves, depth, alpha, beta)
+        return play(game, legal_moves, depth, alpha, beta)
+
+    def pvs_maximize_play(self, game, legal_moves, depth, alpha, beta):
+        """PVS maximizer player. Returns the highest score/move tuple found in game,
+        testing every move after the first one with the null window (alpha, alpha+)
+        """
+        ordering = self.move_ordering
+        search = self.principal_variation_search
+        highest_score, selected_move = (float('-inf'), (-1, -1))
+        for index, move in enumerate(legal_moves):
+            if index == 0:
+                score, _ = self.search_successor(search, game, move, depth - 1, alpha, beta, False)
+            else:
+                null_beta = math.nextafter(alpha, float('inf'))
+                score, _ = self.search_successor(search, game, move, depth - 1, alpha, null_beta, False)
+                if alpha < score < beta:
+                    score, _ = self.search_successor(search, game, move, depth - 1, alpha, beta, False)
+            if score > highest_score:
+                highest_score, selected_move = score, move
+            if score > alpha:
+                alpha = score
+                if ordering is not None:
+                    ordering.update_pv(game, move)
+            if alpha >= beta:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
+                break
+        return (highest_score, selected_move)
+
+    def pvs_minimize_play(self, game, legal_moves, depth, alpha, beta):
+        """PVS minimizer player. Returns the lowest score/move tuple found in game,
+        testing every move after the first one with the null window (beta-, beta)
+        """
+        ordering = self.move_ordering
+        search = self.principal_variation_search
+        lowest_score, selected_move = (float('inf'), (-1, -1))
+        for index, move in enumerate(legal_moves):
+            if index == 0:
+                score, _ = self.search_successor(search, game, move, depth - 1, alpha, beta, True)
+            else:
+                null_alpha = math.nextafter(beta, float('-inf'))
+                score, _ = self.search_successor(search, game, move, depth - 1, null_alpha, beta, True)
+                if alpha < score < beta:
+                    score, _ = self.search_successor(search, game, move, depth - 1, alpha, beta, True)
+            if score < lowest_score:
                 lowest_score, selected_move = score, move
+            if score < beta:
+                beta = score
+                if ordering is not None:
+                    ordering.update_pv(game, move)
             if beta <= alpha:
+                if ordering is not None:
+                    ordering.cutoff(game, move, index, depth)
                 break
         return (lowest_score, selected_move)
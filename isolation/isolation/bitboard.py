@@ -0,0 +1,321 @@
+"""
+This file contains the `BitBoard` class, a drop-in replacement for
+`isolation.Board` that stores the blocked cells of the grid as the bits of a
+single integer and the player locations as square indices. Knight moves are
+read from per-square masks that are computed once for each board size and
+shared by every instance.
+
+Squares are indexed in row-major order, i.e., the cell (row, col) maps to the
+bit `row * width + col`.
+"""
+
+from .isolation import Board
+from .isolation import knight_neighbors
+from .zobrist import zobrist_keys
+
+# (width, height) -> (squares, masks, moves); see `knight_tables()`
+_KNIGHT_TABLES = {}
+
+
+def knight_tables(width, height):
+    """
+    Return the precomputed move tables for a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (tuple, tuple, tuple)
+        `squares[i]` is the (row, col) coordinate pair of square i,
+        `masks[i]` is the integer with one bit set for every knight move
+        from square i, and `moves[i]` is a tuple of (bit, (row, col)) pairs
+        for the same moves listed in the order used by `Board`.
+    """
+    tables = _KNIGHT_TABLES.get((width, height))
+    if tables is None:
+        neighbors = knight_neighbors(width, height)
+        squares = tuple((r, c) for r in range(height) for c in range(width))
+        masks = []
+        moves = []
+        for r, c in squares:
+            targets = tuple((1 << (row * width + col), (row, col))
+                            for row, col in neighbors[r][c])
+            mask = 0
+            for bit, _ in targets:
+                mask |= bit
+            masks.append(mask)
+            moves.append(targets)
+        tables = (squares, tuple(masks), tuple(moves))
+        _KNIGHT_TABLES[(width, height)] = tables
+    return tables
+
+
+class BitBoard(Board):
+    """
+    Implement the Isolation `Board` on integer bitboards. The public API is
+    the same as `Board`, so agents and heuristics run on either class
+    unchanged.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__squares__, self.__masks__, self.__moves__ = knight_tables(width, height)
+        self.__blocked__ = 0
+        self.__player_squares__ = {player_1: None, player_2: None}
+        self.__undo_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__zobrist_hash__ = 0
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        new_board = self.__class__(self.__player_1__, self.__player_2__,
+                                   width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__blocked__ = self.__blocked__
+        new_board.__player_squares__ = self.__player_squares__.copy()
+        new_board.__undo_stack__ = self.__undo_stack__.copy()
+        new_board.__zobrist_hash__ = self.__zobrist_hash__
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self.__blocked__ >> (row * self.width + col) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        blocked = self.__blocked__
+        width = self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if not blocked >> (i * width + j) & 1]
+
+    def get_player_location(self, player):
+        """
+        Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the input player.
+        """
+        square = self.__player_squares__[player]
+        if square is None:
+            return Board.NOT_MOVED
+        return self.__squares__[square]
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        square = self.__player_squares__[player]
+        if square is None:
+            return self.get_blank_spaces()
+        blocked = self.__blocked__
+        return [move for bit, move in self.__moves__[square] if not blocked & bit]
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        square = row * self.width + col
+        self.__zobrist_hash__ ^= self.__zobrist_move__(self.__active_player__, square)
+        self.__player_squares__[self.__active_player__] = square
+        self.__blocked__ |= 1 << square
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def push_move(self, move):
+        """
+        Apply a move in place like `apply_move()`, and remember what it
+        changed so that it can be reverted with `pop_move()`.
+        """
+        self.__undo_stack__.append(self.__player_squares__[self.__active_player__])
+        self.apply_move(move)
+
+    def pop_move(self):
+        """
+        Revert the last move applied with `push_move()` and return it.
+        """
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        square = self.__player_squares__[self.__active_player__]
+        self.__blocked__ ^= 1 << square
+        self.__player_squares__[self.__active_player__] = self.__undo_stack__.pop()
+        self.__zobrist_hash__ ^= self.__zobrist_move__(self.__active_player__, square)
+        self.move_count -= 1
+        return self.__squares__[square]
+
+    def __zobrist_move__(self, player, square):
+        """
+        Return the XOR of the Zobrist keys that change when `player` moves
+        from its current location to `square` (or back).
+        """
+        keys = self.__zobrist_keys__
+        locations = keys.locations[player != self.__player_1__]
+        delta = keys.blocked[square] ^ locations[square] ^ keys.side
+        previous = self.__player_squares__[player]
+        if previous is not None:
+            delta ^= locations[previous]
+        return delta
+
+    def _is_trapped(self, player):
+        """ Test whether the specified player has no legal moves left. """
+        square = self.__player_squares__[player]
+        if square is None:
+            return self.__blocked__ == (1 << (self.width * self.height)) - 1
+        return not self.__masks__[square] & ~self.__blocked__
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self.__inactive_player__ and self._is_trapped(self.__active_player__)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self.__active_player__ and self._is_trapped(self.__active_player__)
+
+    def utility(self, player):
+        """
+        Returns the utility of the current game state from the perspective
+        of the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the utility for the active player on the board.
+
+        Returns
+        ----------
+        float
+            The utility value of the current game state for the specified
+            player. The game has a utility of +inf if the player has won,
+            a value of -inf if the player has lost, and a value of 0
+            otherwise.
+        """
+        if self._is_trapped(self.__active_player__):
+
+            if player == self.__inactive_player__:
+                return float("inf")
+
+            if player == self.__active_player__:
+                return float("-inf")
+
+        return 0.
+
+    def __get_moves__(self, move):
+        """
+        Generate the list of possible moves for an L-shaped motion (like a
+        knight in chess).
+        """
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        r, c = move
+        blocked = self.__blocked__
+        return [m for bit, m in self.__moves__[r * self.width + c] if not blocked & bit]
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_loc = self.__player_squares__[self.__player_1__]
+        p2_loc = self.__player_squares__[self.__player_2__]
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+                square = i * self.width + j
+
+                if not self.__blocked__ >> square & 1:
+                    out += ' '
+                elif square == p1_loc:
+                    out += '1'
+                elif square == p2_loc:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -13,9 +13,46 @@ import timeit
 from copy import deepcopy
 from copy import copy
 
+from .zobrist import zobrist_keys
+
 
 TIME_LIMIT_MILLIS = 200
 
+DIRECTIONS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1))
+
+# (width, height) -> knight neighbor table; see `knight_neighbors()`
+_KNIGHT_NEIGHBORS = {}
+
+
+def knight_neighbors(width, height):
+    """
+    Return the table of knight moves for a board of the given size. The
+    table is computed once per board size and shared by all the boards.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    tuple<tuple<tuple<(int, int)>>>
+        `table[row][col]` is the tuple of the on-board cells one knight move
+        away from (row, col), in a fixed order.
+    """
+    table = _KNIGHT_NEIGHBORS.get((width, height))
+    if table is None:
+        table = tuple(tuple(tuple((r + dr, c + dc) for dr, dc in DIRECTIONS
+                                  if 0 <= r + dr < height and 0 <= c + dc < width)
+                            for c in range(width))
+                      for r in range(height))
+        _KNIGHT_NEIGHBORS[(width, height)] = table
+    return table
+
 
 class Board(object):
     """
@@ -52,6 +89,10 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__undo_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__zobrist_hash__ = 0
+        self.__neighbors__ = knight_neighbors(width, height)
 
     @property
     def active_player(self):
@@ -69,6 +110,15 @@ class Board(object):
         """
         return self.__inactive_player__
 
+    @property
+    def zobrist_hash(self):
+        """
+        The 64-bit Zobrist hash of the current game state (blocked cells,
+        player locations and initiative). The hash is updated incrementally
+        as moves are applied or reverted, so reading it is O(1).
+        """
+        return self.__zobrist_hash__
+
     def get_opponent(self, player):
         """
         Return the opponent of the supplied player.
@@ -100,6 +150,8 @@ class Board(object):
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__undo_stack__ = copy(self.__undo_stack__)
+        new_board.__zobrist_hash__ = self.__zobrist_hash__
         return new_board
 
     def forecast_move(self, move):
@@ -200,11 +252,64 @@ class Board(object):
         None
         """
         row, col = move
+        self.__zobrist_hash__ ^= self.__zobrist_move__(self.active_player, move)
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def push_move(self, move):
+        """
+        Apply a move in place like `apply_move()`, and remember what it
+        changed so that it can be reverted with `pop_move()`. Searching with
+        push_move()/pop_move() avoids the board copy made by
+        `forecast_move()` at every node.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        self.__undo_stack__.append(self.__last_player_move__[self.__active_player__])
+        self.apply_move(move)
+
+    def pop_move(self):
+        """
+        Revert the last move applied with `push_move()`.
+
+        Returns
+        ----------
+        (int, int)
+            The move that was reverted.
+        """
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.__last_player_move__[self.__active_player__]
+        row, col = move
+        self.__board_state__[row][col] = Board.BLANK
+        self.__last_player_move__[self.__active_player__] = self.__undo_stack__.pop()
+        self.__zobrist_hash__ ^= self.__zobrist_move__(self.__active_player__, move)
+        self.move_count -= 1
+        return move
+
+    def __zobrist_move__(self, player, move):
+        """
+        Return the XOR of the Zobrist keys that change when `player` moves
+        from its current location to `move` (or back).
+        """
+        keys = self.__zobrist_keys__
+        locations = keys.locations[self.__player_symbols__[player] - 1]
+        square = move[0] * self.width + move[1]
+        delta = keys.blocked[square] ^ locations[square] ^ keys.side
+        previous = self.__last_player_move__[player]
+        if previous != Board.NOT_MOVED:
+            delta ^= locations[previous[0] * self.width + previous[1]]
+        return delta
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -257,13 +362,9 @@ class Board(object):
             return self.get_blank_spaces()
 
         r, c = move
-
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
-
-        return valid_moves
+        board_state = self.__board_state__
+        return [(row, col) for row, col in self.__neighbors__[r][c]
+                if board_state[row][col] == Board.BLANK]
 
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
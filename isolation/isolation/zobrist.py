@@ -0,0 +1,56 @@
+"""
+This file contains the random keys used to compute the Zobrist hash of an
+Isolation game state. The hash of a state is the XOR of
+
+    - the `blocked` key of every blocked square,
+    - the `locations[i]` key of the square occupied by player i + 1, and
+    - the `side` key when the second player holds initiative,
+
+so applying or undoing a move only needs to XOR the handful of keys that
+changed. Keys are drawn from a fixed seed so that hashes are reproducible
+between runs and processes.
+"""
+
+import random
+
+from collections import namedtuple
+
+
+ZOBRIST_SEED = 0x15014710
+
+ZobristKeys = namedtuple("ZobristKeys", ["blocked", "locations", "side"])
+
+# (width, height) -> ZobristKeys; see `zobrist_keys()`
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """
+    Return the Zobrist keys for a board of the given size. Squares are
+    indexed in row-major order, i.e., the cell (row, col) is the key at
+    index `row * width + col`.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    ZobristKeys
+        `blocked` and `locations[0]`/`locations[1]` are tuples with one
+        64-bit key per square, and `side` is a single 64-bit key.
+    """
+    keys = _ZOBRIST_KEYS.get((width, height))
+    if keys is None:
+        rng = random.Random(ZOBRIST_SEED ^ (width << 16) ^ height)
+        squares = range(width * height)
+        keys = ZobristKeys(blocked=tuple(rng.getrandbits(64) for _ in squares),
+                           locations=(tuple(rng.getrandbits(64) for _ in squares),
+                                      tuple(rng.getrandbits(64) for _ in squares)),
+                           side=rng.getrandbits(64))
+        _ZOBRIST_KEYS[(width, height)] = keys
+    return keys
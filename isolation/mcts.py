@@ -0,0 +1,297 @@
+"""This file contains `MCTSPlayer`, a game-playing agent using Monte Carlo tree
+search (MCTS) with UCT selection, as an alternative to the alphabeta search
+of `game_agent.CustomPlayer`.
+
+Every iteration of the search
+
+    1. selects a path from the root by UCT (upper confidence bounds applied
+       to trees) until it reaches a node with unexplored moves,
+    2. expands one of those moves into a new node,
+    3. plays the game out from the new node with a playout policy, and
+    4. counts the result in the nodes of the path.
+
+The moves are applied in place on a single board with `Board.push_move()`
+and undone with `Board.pop_move()`, so iterations don't copy boards. The
+search runs until the timer is about to expire, and the subtree of the game
+state reached after the opponent's reply is kept for the next turn.
+"""
+
+import math
+import random
+import time
+
+from multiprocessing import Pool, TimeoutError
+
+from parallel import dumps_search, loads_search
+
+
+def random_playout(game, legal_moves, rng):
+    """Playout policy choosing a random move."""
+    return legal_moves[int(rng.random() * len(legal_moves))]
+
+
+def mobility_playout(game, legal_moves, rng):
+    """Playout policy choosing the move with the most onward moves (ties are
+    broken randomly).
+    """
+    best_moves, best_count = [], -1
+    for move in legal_moves:
+        count = len(game.__get_moves__(move))
+        if count > best_count:
+            best_moves, best_count = [move], count
+        elif count == best_count:
+            best_moves.append(move)
+    return best_moves[int(rng.random() * len(best_moves))]
+
+
+class _Node:
+    """Node of the search tree: the game state reached by playing `move` from
+    the state of the parent node. `wins` counts the playouts won by the
+    player who played `move`. Nodes don't link back to their parent, so
+    discarded subtrees are freed as soon as they are dropped (instead of
+    waiting for the garbage collector to break reference cycles).
+    """
+
+    __slots__ = ("move", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, untried):
+        self.move = move
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0
+
+
+def mcts_worker(data, seed, deadline):
+    """Search the pickled game with a new tree until the `deadline` (in the
+    `time.monotonic()` clock), and return the visit count of each root move.
+    """
+    agent, game = loads_search(data)
+    agent.rng.seed(seed)
+    time_left = lambda: 1000 * (deadline - time.monotonic())
+    root = agent.search(game, None, time_left)
+    return {child.move: child.visits for child in root.children}
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo tree search.
+
+    Parameters
+    ----------
+    playout : callable (optional)
+        The playout policy: a function of the game, its legal moves and a
+        `random.Random` object returning the move to play (e.g.,
+        `random_playout` or `mobility_playout`).
+
+    exploration : float (optional)
+        The exploration constant of UCT; larger values spread the playouts
+        over more moves.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is stopped.
+
+    reuse_tree : boolean (optional)
+        Flag indicating whether to keep the subtree of the current game state
+        between turns.
+
+    workers : int (optional)
+        The number of worker processes that search independent trees from
+        the root (root parallelization); the move visited most over all the
+        trees is played. 1 searches in the calling process. Trees are not
+        reused between turns by parallel search. Call close() to stop the
+        workers when the agent is no longer needed.
+
+    seed : int (optional)
+        The seed of the random number generator of the search.
+    """
+
+    def __init__(self, playout=random_playout, exploration=math.sqrt(2),
+                 timeout=10., reuse_tree=True, workers=1, seed=None):
+        self.playout = playout
+        self.exploration = exploration
+        self.TIMER_THRESHOLD = timeout
+        self.reuse_tree = reuse_tree
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.time_left = None
+        self.root = None
+        self.root_game = None
+        self.discarded = None
+        self.iterations = 0
+        self.pool = Pool(workers) if workers > 1 else None
+
+    def __getstate__(self):
+        """Pickle the agent without its timer, tree and worker pool."""
+        state = self.__dict__.copy()
+        state.update(time_left=None, root=None, root_game=None, discarded=None, pool=None)
+        return state
+
+    def close(self):
+        """Stop the worker processes of parallel search, if any."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            The move visited most by the search; (-1, -1) if there are no
+            available legal moves.
+        """
+        self.time_left = time_left
+        self.discarded = None  # free the rest of the last tree on this turn's clock
+        if not legal_moves:
+            return (-1, -1)
+
+        if self.pool is not None and len(legal_moves) > 1:
+            return self.parallel_move(game, legal_moves, time_left)
+
+        root = self.search(game, self.reused_root(game), time_left)
+        if not root.children:
+            return legal_moves[0]
+        best = max(root.children, key=lambda child: child.visits)
+        if self.reuse_tree:
+            self.root, self.root_game = best, game.forecast_move(best.move)
+        self.discarded = root
+        return best.move
+
+    def reused_root(self, game):
+        """Return the node of the game state in the tree kept from the last
+        turn, or None if the tree doesn't hold it.
+        """
+        root, root_game = self.root, self.root_game
+        self.root = self.root_game = None
+        if root is None or game.move_count != root_game.move_count + 1:
+            return None
+        move = game.get_player_location(game.inactive_player)
+        root = next((child for child in root.children if child.move == move), None)
+        if root is None:
+            return None
+        root_game.apply_move(move)
+        if root_game.zobrist_hash != game.zobrist_hash:
+            return None
+        return root
+
+    def search(self, game, root, time_left):
+        """Run search iterations from the game state until the timer expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The root game state; moves are applied and undone in place, so the
+            board is unchanged when the search returns.
+
+        root : `_Node` or None
+            The node of the root game state kept from an earlier search, or
+            None to start a new tree.
+
+        time_left : callable
+            A function that returns the number of milliseconds left for the
+            search.
+
+        Returns
+        -------
+        `_Node`
+            The root node of the tree.
+        """
+        if root is None:
+            root = _Node(None, self.shuffled(game.get_legal_moves()))
+        self.iterations = 0
+        while time_left() > self.TIMER_THRESHOLD:
+            self.iterate(game, root)
+            self.iterations += 1
+        return root
+
+    def iterate(self, game, root):
+        """Run one iteration of the search (selection, expansion, playout and
+        backpropagation) from the root node.
+        """
+        node = root
+        path = [root]
+        log = math.log
+        sqrt = math.sqrt
+        exploration = self.exploration
+        while not node.untried and node.children:
+            scale = exploration * sqrt(log(node.visits))
+            node = max(node.children, key=lambda child: child.wins / child.visits +
+                       scale / sqrt(child.visits))
+            game.push_move(node.move)
+            path.append(node)
+        if node.untried:
+            move = node.untried.pop()
+            game.push_move(move)
+            child = _Node(move, self.shuffled(game.get_legal_moves()))
+            node.children.append(child)
+            path.append(child)
+
+        # the player who moved into the last node wins if the player holding
+        # initiative in its game state runs out of moves first
+        mover_wins = self.play_out(game) % 2 == 0
+        for node in reversed(path):
+            node.visits += 1
+            if mover_wins:
+                node.wins += 1
+            mover_wins = not mover_wins
+
+        for _ in range(len(path) - 1):
+            game.pop_move()
+
+    def play_out(self, game):
+        """Play the game to the end with the playout policy, restore the board
+        and return the number of moves played.
+        """
+        rng = self.rng
+        playout = self.playout
+        length = 0
+        legal_moves = game.get_legal_moves()
+        while legal_moves:
+            game.push_move(playout(game, legal_moves, rng))
+            length += 1
+            legal_moves = game.get_legal_moves()
+        for _ in range(length):
+            game.pop_move()
+        return length
+
+    def shuffled(self, moves):
+        """Shuffle a list of moves in place and return it."""
+        self.rng.shuffle(moves)
+        return moves
+
+    def parallel_move(self, game, legal_moves, time_left):
+        """Search independent trees on the worker processes and return the move
+        with the most visits over all the trees.
+        """
+        margin = self.TIMER_THRESHOLD
+        deadline = time.monotonic() + (time_left() - 2 * margin) / 1000
+        data = dumps_search(self, game)
+        pending = [self.pool.apply_async(mcts_worker, (data, self.rng.getrandbits(32), deadline))
+                   for _ in range(self.workers)]
+
+        visits = dict.fromkeys(legal_moves, 0)
+        for result in pending:
+            try:
+                for move, count in result.get(max(0., (time_left() - margin) / 1000)).items():
+                    visits[move] += count
+            except TimeoutError:
+                pass
+        return max(legal_moves, key=lambda move: visits[move])
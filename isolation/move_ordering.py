@@ -0,0 +1,151 @@
+"""This file contains the move ordering used by `game_agent.CustomPlayer` to
+search the most promising moves first during alphabeta search, which makes
+the search prune more of the game tree.
+
+At every node the moves are searched in this order:
+
+    1. the principal variation (PV) move found by the previous iteration of
+       iterative deepening, while the search is following that variation,
+    2. the killer moves of the ply, i.e., the latest moves that caused a
+       cutoff in a sibling node,
+    3. the remaining moves, sorted by their history score (the total of
+       depth * depth over the cutoffs each move caused for the same player).
+"""
+
+from collections import Counter
+
+
+class MoveOrdering:
+    """Order the moves of the nodes of an alphabeta search, and learn from
+    the cutoffs found by the search.
+
+    Plies are counted from the root of the search, and are derived from the
+    move count of the board (see `new_iteration()`).
+
+    Parameters
+    ----------
+    pv : boolean (optional)
+        Flag indicating whether to search the moves of the previous
+        principal variation first.
+
+    killers : int (optional)
+        The number of killer moves remembered for each ply; 0 disables
+        killer moves.
+
+    history : boolean (optional)
+        Flag indicating whether to sort the remaining moves by their history
+        score.
+    """
+
+    def __init__(self, pv=True, killers=2, history=True):
+        self.use_pv = pv
+        self.num_killers = killers
+        self.use_history = history
+        self.root_move_count = 0
+        self.pv = ()
+        self.pv_table = {}
+        self.follow_pv = False
+        self.killers = {}
+        self.history = ({}, {})
+        self.cutoff_positions = Counter()
+        self.nodes = 0
+
+    def new_search(self):
+        """Prepare for the search of a new turn: forget the previous principal
+        variation and killer moves (they refer to other plies now) and halve
+        the history scores so that recent cutoffs weigh more.
+        """
+        self.pv = ()
+        self.pv_table = {}
+        self.killers = {}
+        for table in self.history:
+            for move in table:
+                table[move] //= 2
+
+    def new_iteration(self, game):
+        """Prepare for a new iteration of iterative deepening from the root
+        `game` state, following the principal variation of the last iteration.
+        """
+        self.root_move_count = game.move_count
+        self.pv = self.pv_table.get(0, ())
+        self.pv_table = {}
+        self.follow_pv = self.use_pv and bool(self.pv)
+
+    def enter(self, game):
+        """Register a node of the search and return its ply."""
+        ply = game.move_count - self.root_move_count
+        self.pv_table[ply] = ()
+        return ply
+
+    def enter_leaves(self, game):
+        """Register the children of the node of `game` as leaves that are
+        scored without being searched (so they have no principal variation).
+        """
+        self.pv_table[game.move_count - self.root_move_count + 1] = ()
+
+    def order(self, moves, ply):
+        """Return the list of moves in the order they should be searched.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            The legal moves of a node of the search.
+
+        ply : int
+            The ply of the node (see `enter()`).
+
+        Returns
+        -------
+        list<(int, int)>
+            The same moves, best candidates first.
+        """
+        self.nodes += 1
+        first = []
+        if self.follow_pv:
+            if ply < len(self.pv) and self.pv[ply] in moves:
+                first.append(self.pv[ply])
+            else:
+                self.follow_pv = False
+        for move in self.killers.get(ply, ()):
+            if move in moves and move not in first:
+                first.append(move)
+        if first:
+            moves = [move for move in moves if move not in first]
+        if self.use_history:
+            history = self.history[ply % 2]
+            moves.sort(key=lambda move: history.get(move, 0), reverse=True)
+        return first + moves if first else moves
+
+    def update_pv(self, game, move):
+        """Record `move` as the best move found so far at the node of `game`,
+        extending it with the principal variation of the searched child.
+        """
+        ply = game.move_count - self.root_move_count
+        self.pv_table[ply] = (move,) + self.pv_table.get(ply + 1, ())
+
+    def cutoff(self, game, move, index, depth):
+        """Learn from a cutoff caused by `move` (the index-th move searched)
+        at the node of `game` searched to `depth`.
+        """
+        ply = game.move_count - self.root_move_count
+        self.cutoff_positions[index] += 1
+        if self.num_killers:
+            killers = self.killers.get(ply, ())
+            if move not in killers:
+                self.killers[ply] = ((move,) + killers)[:self.num_killers]
+        if self.use_history:
+            history = self.history[ply % 2]
+            history[move] = history.get(move, 0) + depth * depth
+
+    @property
+    def first_move_cutoff_rate(self):
+        """Fraction of the cutoffs that were caused by the first move searched."""
+        cutoffs = sum(self.cutoff_positions.values())
+        return self.cutoff_positions[0] / cutoffs if cutoffs else 0.
+
+    def stats(self):
+        """Return the ordering counters as a dictionary."""
+        return {"nodes": self.nodes,
+                "cutoffs": sum(self.cutoff_positions.values()),
+                "first_move_cutoff_rate": self.first_move_cutoff_rate,
+                "cutoff_positions": dict(self.cutoff_positions)}
@@ -0,0 +1,246 @@
+"""This file contains the opening book used by `game_agent.CustomPlayer` to
+answer the first moves of a game without searching, and the script that
+builds it offline.
+
+The builder enumerates every game state reachable within the first plies of
+a game (e.g., every placement of both players), keeps a single state per
+class of symmetric states (see `symmetry.py`), and runs a deep
+time-limited search on each one. The book file is a header followed by one
+fixed-size (key, move) record per state, sorted by key:
+
+    - the key is a 64-bit hash of the canonical form of the game state (see
+      `symmetry.canonicalize()`),
+    - the move is the square the player holding initiative should occupy in
+      the canonical game state.
+
+Books are memory-mapped when first probed, and probed by binary search, so
+loading a book costs nothing and a probe takes a few microseconds.
+
+Build a book with, e.g.,
+
+    python opening_book.py book.bin --plies 0 1 2 --time 2000 --processes 4
+
+and pass its path to the agent with `CustomPlayer(opening_book="book.bin")`.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import timeit
+
+from multiprocessing import Pool
+
+from isolation import BitBoard
+from move_ordering import MoveOrdering
+from symmetry import canonicalize, canonical_hash
+
+BOOK_MAGIC = b"ISOB"
+HEADER = struct.Struct("<4sBBBxI")  # magic, width, height, max move count, size
+RECORD = struct.Struct("<QB")  # key, move square
+
+
+def canonical_key(game):
+    """Return the key of the canonical form of a game state, and the Transform
+    that maps the game state to it.
+    """
+    form, transform = canonicalize(game)
+    return canonical_hash(form, game.width, game.height), transform
+
+
+class OpeningBook:
+    """Read-only opening book stored in a file written by `build_book()`.
+
+    Parameters
+    ----------
+    path : str
+        The path of the book file. The file is opened the first time the
+        book is probed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+        self.width = self.height = self.max_move_count = self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        """Pickle the path of the book; the file is opened again on demand."""
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __len__(self):
+        self.open()
+        return self.size
+
+    def open(self):
+        """Memory-map the book file, if not mapped yet."""
+        if self.data is not None:
+            return
+        with open(self.path, "rb") as book_file:
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.max_move_count, self.size = \
+            HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC:
+            raise ValueError("{} is not an opening book".format(self.path))
+
+    def close(self):
+        """Unmap the book file."""
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def lookup(self, key):
+        """Return the move square stored for a canonical key, or None."""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            record_key, square = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return square
+        return None
+
+    def probe(self, game):
+        """Return the book move for the player holding initiative in the game
+        state, or None if the game state is not in the book.
+        """
+        self.open()
+        if game.move_count > self.max_move_count or \
+                (game.width, game.height) != (self.width, self.height):
+            return None
+        key, transform = canonical_key(game)
+        square = self.lookup(key)
+        if square is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return transform.revert(divmod(square, game.width))
+
+
+def write_book(path, entries, width, height, max_move_count):
+    """Write a book file from a dictionary of canonical keys to move squares."""
+    with open(path, "wb") as book_file:
+        book_file.write(HEADER.pack(BOOK_MAGIC, width, height, max_move_count, len(entries)))
+        for key in sorted(entries):
+            book_file.write(RECORD.pack(key, entries[key]))
+
+
+def opening_positions(width, height, plies):
+    """Return the move sequences leading to one game state per class of
+    symmetric game states, for every game state reached after `plies` moves
+    (e.g., plies=2 gives every placement of both players).
+
+    Returns
+    -------
+    dict<int, tuple<(int, int)>>
+        The move sequence of each game state, by canonical key.
+    """
+    positions = {canonical_key(BitBoard(1, 2, width, height))[0]: ()}
+    for _ in range(plies):
+        successors = {}
+        for moves in positions.values():
+            game = BitBoard(1, 2, width, height)
+            for move in moves:
+                game.apply_move(move)
+            for move in game.get_legal_moves():
+                child = game.forecast_move(move)
+                successors.setdefault(canonical_key(child)[0], moves + (move,))
+        positions = successors
+    return positions
+
+
+def search_position(args):
+    """Search the game state reached by a move sequence for `time_limit`
+    milliseconds, and return its canonical key and the best move square in
+    the canonical game state (None if the game is over).
+    """
+    from game_agent import CustomPlayer  # game_agent imports this module
+
+    width, height, moves, time_limit, agent_args = args
+    agent = CustomPlayer(**agent_args)
+    players = (agent, "opponent") if len(moves) % 2 == 0 else ("opponent", agent)
+    game = BitBoard(players[0], players[1], width, height)
+    for move in moves:
+        game.apply_move(move)
+    legal_moves = game.get_legal_moves()
+    if not legal_moves:
+        return None
+    start = timeit.default_timer()
+    time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+    move = agent.get_move(game, legal_moves, time_left)
+    if move not in legal_moves:
+        move = legal_moves[0]
+    key, transform = canonical_key(game)
+    row, col = transform.apply(move)
+    return key, row * width + col
+
+
+def build_book(path, width=7, height=7, plies=(0, 1, 2), time_limit=2000.,
+               processes=1, agent_args=None):
+    """Search the opening game states and write the book file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the book file to write.
+
+    width, height : int (optional)
+        The size of the board.
+
+    plies : iterable<int> (optional)
+        The move counts of the game states stored in the book.
+
+    time_limit : float (optional)
+        The search time of each game state, in milliseconds.
+
+    processes : int (optional)
+        The number of game states searched in parallel.
+
+    agent_args : dict (optional)
+        The arguments of the `game_agent.CustomPlayer` used to search; the
+        default is iterative deepening principal variation search.
+
+    Returns
+    -------
+    int
+        The number of game states in the book.
+    """
+    if agent_args is None:
+        agent_args = {"method": 'pvs', 'iterative': True, 'make_unmake': True,
+                      'tt_size': 2**18, 'move_ordering': MoveOrdering}
+    plies = sorted(set(plies))
+    tasks = [(width, height, moves, time_limit, agent_args)
+             for ply in plies
+             for moves in opening_positions(width, height, ply).values()]
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.map(search_position, tasks, chunksize=1)
+    else:
+        results = map(search_position, tasks)
+    entries = dict(result for result in results if result is not None)
+    write_book(path, entries, width, height, plies[-1])
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an opening book for Isolation.")
+    parser.add_argument('path', help="Path of the book file to write.")
+    parser.add_argument('--plies', type=int, nargs='+', default=[0, 1, 2],
+                        help="Move counts of the game states stored in the book.")
+    parser.add_argument('--time', type=float, default=2000.,
+                        help="Search time of each game state, in milliseconds.")
+    parser.add_argument('--size', type=int, nargs=2, default=[7, 7], metavar=('WIDTH', 'HEIGHT'),
+                        help="Size of the board.")
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(),
+                        help="Number of game states searched in parallel.")
+    args = parser.parse_args()
+    count = build_book(args.path, args.size[0], args.size[1], args.plies, args.time,
+                       args.processes)
+    print("Wrote {} positions to {}".format(count, args.path))
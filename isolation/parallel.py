@@ -0,0 +1,146 @@
+"""This file contains the root-split parallel search used by
+`game_agent.CustomPlayer` when it is created with more than one worker.
+
+The legal moves of the root are dealt round-robin to a pool of worker
+processes. Every worker runs iterative deepening over its share of the root
+moves until a deadline shortly before the end of the turn, and sends back the
+best (score, move) pair it found at each completed depth. The agent then
+returns the best move at the deepest depth completed by every worker that
+answered in time.
+
+The agent and the board are pickled for every turn, so the heuristic used by
+the agent must be picklable (e.g., a module-level function). The opponent is
+replaced by a placeholder object, so any opponent can be searched against.
+"""
+
+import io
+import pickle
+import time
+
+from multiprocessing import Pool, TimeoutError
+
+
+class _Opponent:
+    """Stand-in for the opponent of the searching agent in worker processes."""
+    pass
+
+
+class _SearchPickler(pickle.Pickler):
+    """Pickler replacing the opponent object with a placeholder."""
+
+    def __init__(self, file, opponent):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.opponent = opponent
+
+    def persistent_id(self, obj):
+        return "opponent" if obj is self.opponent else None
+
+
+class _SearchUnpickler(pickle.Unpickler):
+    """Unpickler restoring the opponent placeholder."""
+
+    def __init__(self, file):
+        super().__init__(file)
+        self.opponent = _Opponent()
+
+    def persistent_load(self, pid):
+        return self.opponent
+
+
+def dumps_search(agent, game):
+    """Pickle the agent and the game it is searching."""
+    buffer = io.BytesIO()
+    _SearchPickler(buffer, game.get_opponent(agent)).dump((agent, game))
+    return buffer.getvalue()
+
+
+def loads_search(data):
+    """Unpickle an (agent, game) pair pickled by `dumps_search()`."""
+    return _SearchUnpickler(io.BytesIO(data)).load()
+
+
+def search_worker(data, moves, deadline):
+    """Search the root `moves` of the pickled game until the `deadline` (in the
+    `time.monotonic()` clock), see `CustomPlayer.search_root_moves()`.
+    """
+    agent, game = loads_search(data)
+    time_left = lambda: 1000 * (deadline - time.monotonic())
+    return agent.search_root_moves(game, moves, time_left)
+
+
+def split_moves(moves, parts):
+    """Deal the moves round-robin into at most `parts` non-empty lists, so that
+    the moves ordered first are spread over all the lists.
+    """
+    return [moves[i::parts] for i in range(min(parts, len(moves)))]
+
+
+def best_common_result(results):
+    """Return the best (score, move) pair at the deepest depth completed by
+    every result list, or None if no list holds a completed depth.
+    """
+    results = [result for result in results if result]
+    if not results:
+        return None
+    depth = min(len(result) for result in results)
+    return max((result[depth - 1] for result in results), key=lambda r: r[0])
+
+
+class RootSplitSearch:
+    """Pool of worker processes searching disjoint subsets of the root moves.
+
+    Parameters
+    ----------
+    workers : int
+        The number of worker processes.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = Pool(workers)
+
+    def close(self):
+        """Stop the worker processes."""
+        self.pool.terminate()
+        self.pool.join()
+
+    def get_move(self, agent, game, legal_moves, time_left):
+        """Search the legal moves of the game on the worker processes and
+        return the best move found before the time limit expires.
+
+        Parameters
+        ----------
+        agent : `game_agent.CustomPlayer`
+            The agent holding initiative in the game.
+
+        game : `isolation.Board`
+            The current game state.
+
+        legal_moves : list<(int, int)>
+            The legal moves of the agent.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn.
+
+        Returns
+        -------
+        (int, int)
+            The best move found; the first legal move if no worker completed
+            a search in time.
+        """
+        margin = agent.TIMER_THRESHOLD
+        deadline = time.monotonic() + (time_left() - 2 * margin) / 1000
+        data = dumps_search(agent, game)
+        pending = [self.pool.apply_async(search_worker, (data, moves, deadline))
+                   for moves in split_moves(legal_moves, self.workers)]
+
+        results = []
+        for result in pending:
+            try:
+                results.append(result.get(max(0., (time_left() - margin) / 1000)))
+            except TimeoutError:
+                pass
+
+        best = best_common_result(results)
+        return best[1] if best is not None else legal_moves[0]
@@ -0,0 +1,210 @@
+"""This file contains the statistics used by `tournament.py` to compare agents
+from the outcome of their games:
+
+    - `elo_ratings()` estimates the Elo rating of every agent, with confidence
+      intervals, from the games played between all pairs of agents. The
+      ratings are the maximum a posteriori estimates of the Bradley-Terry
+      model with a prior of virtual draws between opponents (as in BayesElo),
+      which keeps the ratings finite when an agent wins or loses every game.
+    - `SPRT` implements the sequential probability ratio test, which decides
+      whether an agent is stronger or weaker than an opponent after as few
+      games as the observed results allow.
+"""
+
+import math
+
+from statistics import NormalDist
+
+
+ELO_SCALE = 400. / math.log(10.)  # Elo points per unit of natural log-odds
+
+
+def expected_score(elo_difference):
+    """Return the expected score (probability of winning) of an agent rated
+    `elo_difference` points above its opponent.
+    """
+    return 1. / (1. + 10. ** (-elo_difference / 400.))
+
+
+def elo_ratings(results, num_agents, reference=0, prior=2., confidence=0.95,
+                max_iterations=10000, tolerance=1e-10):
+    """Estimate the Elo rating of a set of agents from their game results.
+
+    Parameters
+    ----------
+    results : iterable<(int, int, float, float)>
+        One (i, j, wins_i, wins_j) tuple per set of games between agent i
+        and agent j, where the wins are the number of games won by each.
+
+    num_agents : int
+        The number of agents; agents are numbered from 0 to num_agents - 1.
+
+    reference : int (optional)
+        The agent whose rating is fixed to 0. Other ratings (and their
+        confidence intervals) are relative to this agent.
+
+    prior : float (optional)
+        The number of virtual drawn games added between every pair of agents
+        that played each other.
+
+    confidence : float (optional)
+        The confidence level of the intervals.
+
+    Returns
+    -------
+    list<(float, float)>
+        The (rating, interval half-width) of every agent; both values are
+        None for agents without games connecting them to the reference.
+    """
+    games = [[0.] * num_agents for _ in range(num_agents)]
+    wins = [0.] * num_agents
+    for i, j, wins_i, wins_j in results:
+        games[i][j] += wins_i + wins_j
+        games[j][i] += wins_i + wins_j
+        wins[i] += wins_i
+        wins[j] += wins_j
+
+    # add the virtual draws of the prior between opponents
+    for i in range(num_agents):
+        for j in range(num_agents):
+            if i != j and games[i][j]:
+                games[i][j] += prior
+                wins[i] += prior / 2.
+
+    connected = _connected(games, reference)
+
+    # minorization-maximization updates of the Bradley-Terry strengths
+    gamma = [1.] * num_agents
+    for _ in range(max_iterations):
+        change = 0.
+        for i in connected:
+            if i == reference:
+                continue
+            denominator = sum(games[i][j] / (gamma[i] + gamma[j])
+                              for j in connected if games[i][j])
+            new_gamma = wins[i] / denominator
+            change = max(change, abs(math.log(new_gamma / gamma[i])))
+            gamma[i] = new_gamma
+        if change < tolerance:
+            break
+
+    # covariance of the log strengths from the inverse of the Fisher information
+    others = [i for i in connected if i != reference]
+    information = [[0.] * len(others) for _ in others]
+    for a, i in enumerate(others):
+        for b, j in enumerate(others):
+            if a == b:
+                information[a][b] = sum(_variance(games, gamma, i, k) for k in connected)
+            else:
+                information[a][b] = -_variance(games, gamma, i, j)
+    covariance = _invert(information) if others else []
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.)
+    ratings = [(None, None)] * num_agents
+    ratings[reference] = (0., 0.)
+    for a, i in enumerate(others):
+        ratings[i] = (ELO_SCALE * math.log(gamma[i] / gamma[reference]),
+                      z * ELO_SCALE * math.sqrt(covariance[a][a]))
+    return ratings
+
+
+def _variance(games, gamma, i, j):
+    """Fisher information contributed by the games between agents i and j."""
+    if i == j or not games[i][j]:
+        return 0.
+    p = gamma[i] / (gamma[i] + gamma[j])
+    return games[i][j] * p * (1. - p)
+
+
+def _connected(games, start):
+    """Return the sorted list of agents connected to `start` by games."""
+    seen = {start}
+    frontier = [start]
+    while frontier:
+        i = frontier.pop()
+        for j, count in enumerate(games[i]):
+            if count and j not in seen:
+                seen.add(j)
+                frontier.append(j)
+    return sorted(seen)
+
+
+def _invert(matrix):
+    """Invert a square matrix (list of rows) by Gauss-Jordan elimination."""
+    n = len(matrix)
+    rows = [list(row) + [float(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        factor = rows[col][col]
+        rows[col] = [value / factor for value in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [value - factor * pivot_value
+                           for value, pivot_value in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+
+class SPRT:
+    """Sequential probability ratio test of the Elo difference between an
+    agent and its opponent, from the games won and lost by the agent.
+
+    The test weighs H0: the agent is rated `elo0` points above its opponent
+    against H1: the agent is rated `elo1` points above its opponent, and
+    stops as soon as the log-likelihood ratio leaves the bounds given by the
+    error rates. With the default bounds, accepting H1 means that the agent
+    is stronger than its opponent and accepting H0 that it is weaker.
+
+    Parameters
+    ----------
+    elo0 : float (optional)
+        The Elo difference of the null hypothesis.
+
+    elo1 : float (optional)
+        The Elo difference of the alternative hypothesis.
+
+    alpha : float (optional)
+        The probability of accepting H1 when H0 is true.
+
+    beta : float (optional)
+        The probability of accepting H0 when H1 is true.
+    """
+
+    H0 = "H0"
+    H1 = "H1"
+
+    def __init__(self, elo0=-50., elo1=50., alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1. - alpha))
+        self.upper = math.log((1. - beta) / alpha)
+        p0 = expected_score(elo0)
+        p1 = expected_score(elo1)
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1. - p1) / (1. - p0))
+        self.wins = 0
+        self.losses = 0
+
+    def update(self, wins, losses):
+        """Add the outcome of more games, and return the decision."""
+        self.wins += wins
+        self.losses += losses
+        return self.decision
+
+    @property
+    def llr(self):
+        """The log-likelihood ratio of H1 over H0 for the games so far."""
+        return self.wins * self.win_llr + self.losses * self.loss_llr
+
+    @property
+    def decision(self):
+        """The accepted hypothesis (SPRT.H0 or SPRT.H1), or None while more
+        games are needed to decide.
+        """
+        llr = self.llr
+        if llr >= self.upper:
+            return SPRT.H1
+        if llr <= self.lower:
+            return SPRT.H0
+        return None
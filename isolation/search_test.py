@@ -0,0 +1,450 @@
+"""
+This file contains test cases for the search extensions of
+`game_agent.CustomPlayer` (make/unmake expansion, transposition table, move
+ordering, etc.). Each extension is checked against the plain search
+implementation exercised by `agent_test.py`.
+"""
+import os
+import random
+import tempfile
+import timeit
+import unittest
+
+import isolation
+import game_agent
+
+from sample_players import improved_score
+from transposition import TranspositionTable, EXACT, LOWER
+from move_ordering import MoveOrdering
+from parallel import best_common_result, split_moves
+from endgame import EndgameSolver
+from opening_book import OpeningBook, build_book
+from symmetry import symmetries
+from mcts import MCTSPlayer, mobility_playout
+from batch_score import NUMPY_MIN_BATCH, score_batch, score_children
+from sample_players import null_score, open_move_score
+
+
+def random_position(board_cls, player, rng, plies):
+    """Return a board where `player` is active after `plies` random moves."""
+    while True:
+        board = board_cls(player, "opponent", 7, 7)
+        for _ in range(plies):
+            legal_moves = board.get_legal_moves()
+            if not legal_moves:
+                break
+            board.apply_move(rng.choice(legal_moves))
+        if board.active_player == player and board.get_legal_moves():
+            return board
+
+
+class MakeUnmakeTest(unittest.TestCase):
+
+    def test_same_result(self):
+        """ make/unmake search returns the same result as forecast_move """
+        rng = random.Random(0)
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for method in ("minimax", "alphabeta"):
+                for _ in range(5):
+                    agent = game_agent.CustomPlayer(3, improved_score, False, method)
+                    agent.time_left = lambda: 1e3
+                    board = random_position(board_cls, agent, rng, 10)
+                    expected = getattr(agent, method)(board, 3)
+                    before = board.to_string()
+                    agent.make_unmake = True
+                    self.assertEqual(expected, getattr(agent, method)(board, 3))
+                    self.assertEqual(before, board.to_string())
+
+    def test_timeout_restores_board(self):
+        """ make/unmake search leaves the board unchanged on timeout """
+        agent = game_agent.CustomPlayer(score_fn=improved_score,
+                                        method="alphabeta", make_unmake=True)
+        board = random_position(isolation.BitBoard, agent, random.Random(2), 6)
+        before = board.to_string()
+        calls = iter(range(50, -1, -1))
+        move = agent.get_move(board, board.get_legal_moves(), lambda: next(calls))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertEqual(before, board.to_string())
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_replacement(self):
+        """ The table keeps deeper and newer entries in a fixed number of slots """
+        table = TranspositionTable(size=4)
+        table.store(1, 3, EXACT, 1., (0, 0))
+        table.store(5, 2, LOWER, 2., (1, 1))
+        self.assertEqual(table.probe(1), (3, EXACT, 1., (0, 0)))
+        self.assertIsNone(table.probe(5))
+        table.new_search()
+        table.store(5, 2, LOWER, 2., (1, 1))
+        self.assertEqual(table.probe(5), (2, LOWER, 2., (1, 1)))
+        self.assertIsNone(table.probe(1))
+        for key in range(100):
+            table.store(key, 1, EXACT, 0., (0, 0))
+        self.assertEqual(len(table), 4)
+        self.assertEqual((table.hits, table.misses), (2, 2))
+
+    def test_same_result(self):
+        """ alphabeta returns the same score with the transposition table """
+        rng = random.Random(4)
+        for _ in range(10):
+            agent = game_agent.CustomPlayer(4, improved_score, False, "alphabeta")
+            agent.time_left = lambda: 1e3
+            board = random_position(isolation.BitBoard, agent, rng, 8)
+            expected, _ = agent.alphabeta(board, 4)
+            agent.transposition_table = TranspositionTable()
+            score, move = agent.alphabeta(board, 4)
+            self.assertEqual(expected, score)
+            self.assertIn(move, board.get_legal_moves())
+
+    def test_symmetric_entries(self):
+        """ symmetric game states share transposition table entries """
+        agent = game_agent.CustomPlayer(4, improved_score, False, "alphabeta",
+                                        tt_size=2**16, symmetric_plies=4)
+        agent.time_left = lambda: 1e3
+        board = isolation.BitBoard(agent, "opponent")
+        board.apply_move((1, 2))
+        board.apply_move((5, 3))
+        mirror = isolation.BitBoard(agent, "opponent")
+        mirror.apply_move((1, 4))
+        mirror.apply_move((5, 3))
+        score, move = agent.alphabeta(board, 4)
+        stores = agent.transposition_table.stores
+        mirror_score, mirror_move = agent.alphabeta(mirror, 4)
+        self.assertEqual(score, mirror_score)
+        self.assertEqual(mirror_move, (move[0], 6 - move[1]))
+        self.assertEqual(agent.transposition_table.stores, stores)
+
+    def test_iterative_deepening_hits(self):
+        """ iterative deepening reuses the results of earlier iterations """
+        agent = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                        make_unmake=True, tt_size=2**12)
+        board = random_position(isolation.BitBoard, agent, random.Random(5), 6)
+        calls = iter(range(2000, -1, -1))
+        move = agent.get_move(board, board.get_legal_moves(), lambda: next(calls))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(agent.transposition_table.hits, 0)
+        self.assertLessEqual(len(agent.transposition_table), 2**12)
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_order(self):
+        """ PV move first, then killers, then moves by history score """
+        ordering = MoveOrdering()
+        ordering.pv_table = {0: ((1, 1), (2, 2))}
+        ordering.new_iteration(isolation.Board("p1", "p2"))
+        ordering.killers = {0: ((3, 3),)}
+        ordering.history[0][(4, 4)] = 9
+        moves = [(0, 0), (3, 3), (4, 4), (1, 1)]
+        self.assertEqual(ordering.order(moves, 0), [(1, 1), (3, 3), (4, 4), (0, 0)])
+        self.assertEqual(ordering.order([(0, 0), (2, 2)], 1), [(2, 2), (0, 0)])
+        self.assertEqual(ordering.order([(0, 0), (2, 2)], 2), [(0, 0), (2, 2)])
+        self.assertFalse(ordering.follow_pv)
+
+    def test_same_result(self):
+        """ alphabeta returns the same score with move ordering """
+        rng = random.Random(6)
+        for _ in range(5):
+            agent = game_agent.CustomPlayer(5, improved_score, False, "alphabeta")
+            agent.time_left = lambda: 1e3
+            ordering = MoveOrdering()
+            board = random_position(isolation.BitBoard, agent, rng, 8)
+            for depth in range(1, 6):
+                agent.move_ordering = None
+                expected, _ = agent.alphabeta(board, depth)
+                agent.move_ordering = ordering
+                ordering.new_iteration(board)
+                score, move = agent.alphabeta(board, depth)
+                self.assertEqual(expected, score)
+                self.assertEqual(move, ordering.pv_table[0][0])
+            self.assertGreater(ordering.first_move_cutoff_rate, 0.5)
+
+class BatchScoreTest(unittest.TestCase):
+
+    HEURISTICS = (null_score, open_move_score, improved_score, game_agent.custom_score)
+
+    def test_score_batch(self):
+        """ batch scores are the scores of the scalar heuristics """
+        rng = random.Random(17)
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            boards = [random_position(board_cls, "player", rng, rng.randint(0, 25))
+                      for _ in range(30)]
+            for score_fn in self.HEURISTICS:
+                for player in ("player", "opponent"):
+                    self.assertEqual(score_batch(boards, player, score_fn).tolist(),
+                                     [score_fn(board, player) for board in boards])
+
+    def test_score_children(self):
+        """ children are scored like their boards, with and without NumPy """
+        rng = random.Random(18)
+        for plies in (0, 1, 6, 16, 24):
+            board = random_position(isolation.BitBoard, "player", rng, plies)
+            moves = board.get_legal_moves()
+            self.assertEqual(len(moves) >= NUMPY_MIN_BATCH, plies < 2)
+            for score_fn in self.HEURISTICS:
+                for player in ("player", "opponent"):
+                    self.assertEqual(score_children(board, moves, player, score_fn),
+                                     [score_fn(board.forecast_move(move), player)
+                                      for move in moves])
+
+    def test_same_result(self):
+        """ search with batch evaluation returns the same result """
+        rng = random.Random(19)
+        for method in ("alphabeta", "pvs"):
+            for _ in range(5):
+                agent = game_agent.CustomPlayer(4, game_agent.custom_score, False, method,
+                                                move_ordering=MoveOrdering)
+                agent.time_left = lambda: 1e3
+                board = random_position(isolation.BitBoard, agent, rng, 8)
+                search = agent.alphabeta if method == "alphabeta" else agent.pvs
+                expected = search(board, 4)
+                agent.batch_eval = True
+                agent.new_search(board)
+                self.assertEqual(search(board, 4), expected)
+
+class PrincipalVariationSearchTest(unittest.TestCase):
+
+    def test_same_result(self):
+        """ pvs returns the alphabeta score with and without aspiration windows """
+        rng = random.Random(7)
+        for options in [{}, {"tt_size": 2**12, "move_ordering": MoveOrdering}]:
+            for _ in range(5):
+                agent = game_agent.CustomPlayer(4, improved_score, False, "pvs",
+                                                make_unmake=True, **options)
+                agent.time_left = lambda: 1e3
+                board = random_position(isolation.BitBoard, agent, rng, 8)
+                for depth in range(1, 6):
+                    expected, _ = agent.alphabeta(board, depth)
+                    if agent.move_ordering is not None:
+                        agent.move_ordering.new_iteration(board)
+                    if agent.transposition_table is not None:
+                        agent.transposition_table.clear()
+                    self.assertEqual(expected, agent.principal_variation_search(board, depth)[0])
+                    agent.aspiration_score = expected + 3 * rng.choice([-1, 1])
+                    score, move = agent.pvs(board, depth)
+                    self.assertEqual(expected, score)
+                    self.assertIn(move, board.get_legal_moves())
+
+    def test_get_move(self):
+        """ iterative deepening with pvs returns a legal move """
+        agent = game_agent.CustomPlayer(score_fn=improved_score, method="pvs",
+                                        make_unmake=True, tt_size=2**12,
+                                        move_ordering=MoveOrdering)
+        board = random_position(isolation.BitBoard, agent, random.Random(8), 6)
+        calls = iter(range(2000, -1, -1))
+        move = agent.get_move(board, board.get_legal_moves(), lambda: next(calls))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertIsNotNone(agent.aspiration_score)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_combine(self):
+        """ root moves are dealt to workers and their results combined by depth """
+        moves = [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]
+        self.assertEqual(split_moves(moves, 2), [moves[0::2], moves[1::2]])
+        self.assertEqual(split_moves(moves[:1], 4), [moves[:1]])
+        results = [[(1., (0, 0)), (2., (2, 2))],
+                   [(3., (1, 1)), (0., (3, 3)), (9., (1, 1))],
+                   []]
+        self.assertEqual(best_common_result(results), (2., (2, 2)))
+        self.assertIsNone(best_common_result([[], []]))
+
+    def test_search_root_moves(self):
+        """ searching subsets of the root moves finds the alphabeta score """
+        rng = random.Random(9)
+        for _ in range(5):
+            agent = game_agent.CustomPlayer(4, improved_score, False, "alphabeta")
+            agent.time_left = lambda: 1e3
+            board = random_position(isolation.BitBoard, agent, rng, 8)
+            expected, _ = agent.alphabeta(board, 4)
+            results = [agent.search_root_moves(board, moves, lambda: 1e3)
+                       for moves in split_moves(board.get_legal_moves(), 3)]
+            self.assertEqual(expected, best_common_result(results)[0])
+
+    def test_get_move(self):
+        """ parallel search returns a legal move before the timer expires """
+        agent = game_agent.CustomPlayer(score_fn=improved_score, method="pvs",
+                                        make_unmake=True, tt_size=2**12,
+                                        move_ordering=MoveOrdering, workers=2)
+        try:
+            board = random_position(isolation.BitBoard, agent, random.Random(10), 6)
+            start = timeit.default_timer()
+            time_left = lambda: 150 - 1000 * (timeit.default_timer() - start)
+            move = agent.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertGreater(time_left(), 0)
+        finally:
+            agent.close()
+
+
+def active_player_wins(game):
+    """Solve the game by exhaustive search."""
+    return any(not active_player_wins(game.forecast_move(move))
+               for move in game.get_legal_moves())
+
+
+class EndgameSolverTest(unittest.TestCase):
+
+    def test_solve(self):
+        """ separated endgames are decided like exhaustive search does """
+        rng = random.Random(11)
+        solver = EndgameSolver()
+        solved = 0
+        while solved < 50:
+            board = isolation.Board("p1", "p2", 5, 5)
+            for _ in range(rng.randint(2, 14)):
+                if not board.get_legal_moves():
+                    break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            result = solver.solve(board)
+            if result is None or len(board.get_blank_spaces()) > 15:
+                continue
+            active_wins, move = result
+            self.assertEqual(active_wins, active_player_wins(board))
+            if active_wins:
+                self.assertFalse(active_player_wins(board.forecast_move(move)))
+            solved += 1
+
+    def test_not_separated(self):
+        """ players sharing open squares are left to the search """
+        board = isolation.BitBoard("p1", "p2")
+        self.assertIsNone(EndgameSolver().solve(board))
+        board.apply_move((3, 3))
+        board.apply_move((2, 4))
+        self.assertIsNone(EndgameSolver().solve(board))
+
+    def test_alphabeta(self):
+        """ alphabeta search with the solver finds the same winner """
+        rng = random.Random(12)
+        for _ in range(10):
+            agent = game_agent.CustomPlayer(20, improved_score, False, "alphabeta",
+                                            endgame=EndgameSolver)
+            agent.time_left = lambda: 1e3
+            board = random_position(isolation.BitBoard, agent, rng, 30)
+            score, move = agent.alphabeta(board, 20)
+            self.assertIn(score, (float("inf"), float("-inf")))
+            self.assertEqual(score > 0, active_player_wins(board))
+            self.assertIn(move, board.get_legal_moves())
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.path = os.path.join(directory, "book.bin")
+        cls.size = build_book(cls.path, 5, 5, plies=(0, 1, 2), time_limit=5.,
+                              agent_args={"method": "alphabeta", "search_depth": 2,
+                                          "iterative": False})
+
+    def test_probe(self):
+        """ the book answers every opening game state with a legal move """
+        book = OpeningBook(self.path)
+        self.assertEqual(len(book), self.size)
+        self.assertLess(self.size, 1 + 25 + 25 * 24)  # symmetric states are stored once
+        for first in [(0, 0), (2, 2), (1, 3)]:
+            board = isolation.Board("p1", "p2", 5, 5)
+            self.assertIn(book.probe(board), board.get_legal_moves())
+            board.apply_move(first)
+            self.assertIn(book.probe(board), board.get_legal_moves())
+            board.apply_move((4, 1))
+            self.assertIn(book.probe(board), board.get_legal_moves())
+            board.apply_move(board.get_legal_moves()[0])
+            self.assertIsNone(book.probe(board))
+
+    def test_symmetric(self):
+        """ symmetric game states get symmetric book moves """
+        book = OpeningBook(self.path)
+        board = isolation.Board("p1", "p2", 5, 5)
+        board.apply_move((0, 1))
+        board.apply_move((3, 3))
+        move = book.probe(board)
+        for permutation in symmetries(5, 5):
+            image = lambda cell: divmod(permutation[cell[0] * 5 + cell[1]], 5)
+            symmetric = isolation.Board("p1", "p2", 5, 5)
+            symmetric.apply_move(image((0, 1)))
+            symmetric.apply_move(image((3, 3)))
+            symmetric_move = book.probe(symmetric)
+            # symmetric moves are equivalent, but not necessarily the same
+            # when the game state is symmetric to itself
+            self.assertIn(symmetric_move, symmetric.get_legal_moves())
+            if image((0, 1)) != (0, 1) or image((3, 3)) != (3, 3):
+                self.assertEqual(symmetric_move, image(move))
+
+    def test_get_move(self):
+        """ the agent plays book moves without searching """
+        agent = game_agent.CustomPlayer(opening_book=self.path)
+        board = isolation.Board(agent, "p2", 5, 5)
+        move = agent.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertEqual(move, agent.opening_book.probe(board))
+        self.assertEqual(agent.opening_book.hits, 2)
+
+
+class MCTSPlayerTest(unittest.TestCase):
+
+    def timer(self, limit):
+        start = timeit.default_timer()
+        return lambda: limit - 1000 * (timeit.default_timer() - start)
+
+    def test_get_move(self):
+        """ MCTS returns a legal move before the timer expires """
+        for playout in (None, mobility_playout):
+            agent = MCTSPlayer(seed=0) if playout is None else MCTSPlayer(playout, seed=0)
+            board = random_position(isolation.BitBoard, agent, random.Random(13), 6)
+            time_left = self.timer(100)
+            before = board.to_string()
+            move = agent.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertGreater(time_left(), 0)
+            self.assertGreater(agent.iterations, 0)
+            self.assertEqual(board.to_string(), before)
+
+    def test_winning_move(self):
+        """ MCTS plays winning moves in small won endgames """
+        rng = random.Random(16)
+        agent = MCTSPlayer(seed=0)
+        tested = 0
+        while tested < 5:
+            board = isolation.BitBoard(agent, "opponent", 5, 5)
+            for _ in range(14):
+                if not board.get_legal_moves():
+                    break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            if board.active_player != agent or not active_player_wins(board):
+                continue
+            move = agent.get_move(board, board.get_legal_moves(), self.timer(50))
+            self.assertFalse(active_player_wins(board.forecast_move(move)))
+            tested += 1
+
+    def test_reuse_tree(self):
+        """ the subtree of the opponent's reply is kept for the next turn """
+        agent = MCTSPlayer(seed=0)
+        board = random_position(isolation.BitBoard, agent, random.Random(14), 4)
+        move = agent.get_move(board, board.get_legal_moves(), self.timer(50))
+        board.apply_move(move)
+        reply = max(agent.root.children, key=lambda child: child.visits)
+        visits = reply.visits
+        board.apply_move(reply.move)
+        self.assertIs(agent.reused_root(board), reply)
+        self.assertGreater(visits, 0)
+        agent.root = None
+        self.assertIsNone(agent.reused_root(board))
+
+    def test_parallel(self):
+        """ root-parallel MCTS returns a legal move before the timer expires """
+        agent = MCTSPlayer(workers=2, seed=0)
+        try:
+            board = random_position(isolation.BitBoard, agent, random.Random(15), 6)
+            time_left = self.timer(150)
+            move = agent.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertGreater(time_left(), 0)
+        finally:
+            agent.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
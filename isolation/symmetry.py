@@ -0,0 +1,186 @@
+"""This file contains the symmetries of the Isolation board, which map game
+states to equivalent game states: knight moves are preserved by reflecting
+the board across its axes, and on square boards also by transposing or
+rotating it, so square boards have 8 symmetries and rectangular boards 4.
+
+Each symmetry is represented as a permutation of the squares of the board,
+indexed in row-major order (the cell (row, col) is square `row * width + col`).
+
+`canonicalize()` maps a game state to the image with the smallest
+`CanonicalForm` over all the symmetries, so that every class of symmetric game
+states has a single representative that caches (opening books, transposition
+tables, solved positions) can share, and returns the `Transform` that maps
+moves between the game state and its canonical form.
+"""
+
+from collections import namedtuple
+
+from endgame import open_squares
+from isolation.zobrist import zobrist_keys
+
+
+# Game state seen from the player holding initiative: the bitmask of the
+# blocked squares, and the squares of the active and inactive players (None
+# if not placed yet)
+CanonicalForm = namedtuple("CanonicalForm", ["blocked", "active", "inactive"])
+
+# (width, height) -> tuple of permutations; see `symmetries()`
+_SYMMETRIES = {}
+
+# (width, height) -> tuple of Transform objects; see `transforms()`
+_TRANSFORMS = {}
+
+
+def symmetries(width, height):
+    """
+    Return the symmetries of a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    tuple<tuple<int>>
+        One permutation per symmetry, starting with the identity; square
+        `i` is mapped to square `permutation[i]`.
+    """
+    permutations = _SYMMETRIES.get((width, height))
+    if permutations is None:
+        w, h = width - 1, height - 1
+        maps = [lambda r, c: (r, c), lambda r, c: (r, w - c),
+                lambda r, c: (h - r, c), lambda r, c: (h - r, w - c)]
+        if width == height:
+            maps += [lambda r, c: (c, r), lambda r, c: (c, h - r),
+                     lambda r, c: (w - c, r), lambda r, c: (w - c, h - r)]
+        permutations = []
+        for transform in maps:
+            permutation = []
+            for r in range(height):
+                for c in range(width):
+                    row, col = transform(r, c)
+                    permutation.append(row * width + col)
+            permutations.append(tuple(permutation))
+        permutations = tuple(permutations)
+        _SYMMETRIES[(width, height)] = permutations
+    return permutations
+
+
+def inverse(permutation):
+    """Return the inverse of a permutation of the squares."""
+    result = [0] * len(permutation)
+    for square, image in enumerate(permutation):
+        result[image] = square
+    return tuple(result)
+
+
+class Transform:
+    """Symmetry of the board, mapping the moves of a game state to the moves
+    of its image (e.g., its canonical form) and back.
+
+    Parameters
+    ----------
+    permutation : tuple<int>
+        The image of every square under the symmetry (see `symmetries()`).
+
+    width : int
+        The number of columns of the board.
+    """
+
+    def __init__(self, permutation, width):
+        self.permutation = permutation
+        self.inverse = inverse(permutation)
+        self.width = width
+
+    def __repr__(self):
+        return "Transform({!r})".format(self.permutation)
+
+    def apply(self, move):
+        """Return the image of a (row, col) move; (-1, -1) and None are kept."""
+        if move is None or move == (-1, -1):
+            return move
+        return divmod(self.permutation[move[0] * self.width + move[1]], self.width)
+
+    def revert(self, move):
+        """Return the move whose image is the (row, col) move `move`."""
+        if move is None or move == (-1, -1):
+            return move
+        return divmod(self.inverse[move[0] * self.width + move[1]], self.width)
+
+
+def transforms(width, height):
+    """Return the symmetries of a board of the given size as Transform objects,
+    starting with the identity.
+    """
+    result = _TRANSFORMS.get((width, height))
+    if result is None:
+        result = tuple(Transform(permutation, width)
+                       for permutation in symmetries(width, height))
+        _TRANSFORMS[(width, height)] = result
+    return result
+
+
+def canonicalize(game):
+    """
+    Map a game state to the canonical form of its class of symmetric game
+    states.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state to map.
+
+    Returns
+    ----------
+    (CanonicalForm, Transform)
+        The canonical form of the game state, and the symmetry that maps the
+        game state to it; `transform.apply()` maps the moves of the game to
+        moves of the canonical form, and `transform.revert()` maps them back.
+    """
+    width, height = game.width, game.height
+    blocked = ~open_squares(game) & ((1 << (width * height)) - 1)
+    squares = []
+    while blocked:
+        bit = blocked & -blocked
+        squares.append(bit.bit_length() - 1)
+        blocked ^= bit
+    locations = []
+    for player in (game.active_player, game.inactive_player):
+        location = game.get_player_location(player)
+        locations.append(None if location is None else location[0] * width + location[1])
+    active, inactive = locations
+
+    best = None
+    for transform in transforms(width, height):
+        permutation = transform.permutation
+        mask = 0
+        for square in squares:
+            mask |= 1 << permutation[square]
+        form = CanonicalForm(mask,
+                             None if active is None else permutation[active],
+                             None if inactive is None else permutation[inactive])
+        if best is None or form < best[0]:
+            best = (form, transform)
+    return best
+
+
+def canonical_hash(form, width, height):
+    """Return a 64-bit hash of a canonical form (e.g., to store it on disk),
+    built from the Zobrist keys of the board size.
+    """
+    keys = zobrist_keys(width, height)
+    key = 0
+    blocked = form.blocked
+    while blocked:
+        bit = blocked & -blocked
+        key ^= keys.blocked[bit.bit_length() - 1]
+        blocked ^= bit
+    if form.active is not None:
+        key ^= keys.locations[0][form.active]
+    if form.inactive is not None:
+        key ^= keys.locations[1][form.inactive]
+    return key
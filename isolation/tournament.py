@@ -19,22 +19,32 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
 import itertools
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
-from isolation import Board
+from isolation import BitBoard
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
 from game_agent import custom_score
+from move_ordering import MoveOrdering
+from endgame import EndgameSolver
+from mcts import MCTSPlayer
+from mcts import mobility_playout
+from rating import SPRT
+from rating import elo_ratings
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+BOARD_CLASS = BitBoard  # isolation.Board implementation used for every game
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
@@ -55,19 +65,41 @@ same opponents.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
+MatchResult = namedtuple("MatchResult", ["wins", "timeouts", "invalid_moves"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, seed=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If `seed` is not None, the random number generator is seeded with it
+    before the games so that the random opening moves (and the moves of
+    random players) are reproducible.
+    """
+    result = tally_match(player1, player2, seed)
+
+    if sum(result.timeouts) != 0:
+        warnings.warn(TIMEOUT_WARNING)
+
+    return result.wins
+
+
+def tally_match(player1, player2, seed=None):
+    """
+    Play a "fair" set of matches between two agents (see `play_match()`) and
+    return a `MatchResult` with the number of wins, and of games lost due to
+    timeout or illegal move, of (player1, player2).
     """
+    if seed is not None:
+        random.seed(seed)
+
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
+    games = [BOARD_CLASS(player1, player2), BOARD_CLASS(player2, player1)]
 
     # initialize both games with a random move and response
     for _ in range(2):
@@ -96,53 +128,164 @@ def play_match(player1, player2):
             else:
                 num_invalid_moves[player1] += 1
 
-    if sum(num_timeouts.values()) != 0:
-        warnings.warn(TIMEOUT_WARNING)
+    return MatchResult(wins=(num_wins[player1], num_wins[player2]),
+                       timeouts=(num_timeouts[player1], num_timeouts[player2]),
+                       invalid_moves=(num_invalid_moves[player1], num_invalid_moves[player2]))
+
+
+def match_tasks(agents, num_matches, seed=None):
+    """
+    List the matches of a round as (opponent index, player 1 index, player 2
+    index, seed) tuples, where indices refer to the `agents` list. The agent
+    under test (the last one) alternates initiative between matches. Match
+    seeds are consecutive integers starting at `seed` (or None if `seed` is
+    None).
+    """
+    tasks = []
+    idx_1 = len(agents) - 1
+    for idx_2 in range(len(agents) - 1):
+        for _ in range(num_matches):
+            # Each player takes a turn going first
+            for p1, p2 in itertools.permutations((idx_1, idx_2)):
+                match_seed = None if seed is None else seed + len(tasks)
+                tasks.append((idx_2, p1, p2, match_seed))
+    return tasks
+
+
+# agents of the current round in each worker process; see `init_worker()`
+_WORKER_AGENTS = None
+
+
+def init_worker(agents, cpus):
+    """
+    Initialize a worker process of a parallel round with its copy of the
+    agents, and pin it to its own CPU (when supported) so that every match
+    gets the same CPU budget.
+    """
+    global _WORKER_AGENTS
+    _WORKER_AGENTS = agents
+    cpu = cpus.get()
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+
+
+def play_task(task):
+    """Play a match of `match_tasks()` in a worker process."""
+    _, p1, p2, seed = task
+    return tally_match(_WORKER_AGENTS[p1].player, _WORKER_AGENTS[p2].player, seed)
+
+
+def play_tasks(agents, tasks, processes):
+    """
+    Play the matches listed by `match_tasks()` and yield their `MatchResult`s
+    in the same order. Matches are played in a pool of worker processes (at
+    most one per available CPU) if `processes` > 1.
+    """
+    if processes <= 1:
+        for _, p1, p2, seed in tasks:
+            yield tally_match(agents[p1].player, agents[p2].player, seed)
+        return
+
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    processes = min(processes, len(cpus) or os.cpu_count() or 1)
+    cpu_queue = multiprocessing.Queue()
+    for idx in range(processes):
+        cpu_queue.put(cpus[idx] if idx < len(cpus) else None)
 
-    return num_wins[player1], num_wins[player2]
+    with multiprocessing.Pool(processes, init_worker, (agents, cpu_queue)) as pool:
+        yield from pool.imap(play_task, tasks)
 
 
-def play_round(agents, num_matches):
+def play_round(agents, num_matches, processes=1, seed=None, sprt=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    The matches are played in `processes` worker processes when it is
+    greater than 1, and are seeded from `seed` when it is not None (see
+    `match_tasks()`). If `sprt` is not None, it is called to create a
+    `rating.SPRT` test for every pairing, and the pairing stops as soon as
+    the test decides whether the agent under test is stronger or weaker
+    than its opponent (`num_matches` then is the maximum number of matches
+    per initiative).
     """
     agent_1 = agents[-1]
     wins = 0.
     total = 0.
+    num_timeouts = 0
+    num_invalid_moves = 0
+    records = []
 
     print("\nPlaying Matches:")
     print("----------")
 
+    tasks = match_tasks(agents, num_matches, seed)
+
     for idx, agent_2 in enumerate(agents[:-1]):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
+
+        test = sprt() if sprt is not None else None
+        pairing = [task for task in tasks if task[0] == idx]
+        results = play_tasks(agents, pairing, processes)
+        for (_, p1, p2, _), result in zip(pairing, results):
+            counts[agents[p1].player] += result.wins[0]
+            counts[agents[p2].player] += result.wins[1]
+            total += sum(result.wins)
+            num_timeouts += sum(result.timeouts)
+            num_invalid_moves += sum(result.invalid_moves)
+            records.append((p1, p2) + tuple(result.wins))
+
+            if test is not None:
+                won = result.wins[0] if p1 == len(agents) - 1 else result.wins[1]
+                if test.update(won, sum(result.wins) - won) is not None:
+                    results.close()
+                    break
 
         wins += counts[agent_1.player]
 
         print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+                                          int(counts[agent_2.player])), end='')
+        if test is not None:
+            print("\tSPRT: {}".format({SPRT.H1: "stronger", SPRT.H0: "weaker",
+                                        None: "undecided"}[test.decision]), end='')
+        print()
+
+    if num_timeouts != 0:
+        warnings.warn(TIMEOUT_WARNING)
+
+    print_ratings(agents, records)
 
     return 100. * wins / total
 
 
-def main():
+def print_ratings(agents, records):
+    """
+    Print the Elo rating of the agents (relative to the first agent, with
+    95% confidence intervals) estimated from the (player 1 index, player 2
+    index, player 1 wins, player 2 wins) records of their matches.
+    """
+    ratings = elo_ratings(records, len(agents))
+    print("\nElo Ratings (relative to {}):".format(agents[0].name))
+    print("----------")
+    for agent, (elo, interval) in zip(agents, ratings):
+        if elo is None:
+            print("  {!s:<15}{:>8}".format(agent.name, "n/a"))
+        else:
+            print("  {!s:<15}{:>8.0f} +/- {:.0f}".format(agent.name, elo, interval))
+
+
+def main(processes=1, seed=None, sprt=None, book=None):
 
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    CUSTOM_ARGS = {"method": 'pvs', 'iterative': True, 'make_unmake': True,
+                   'tt_size': 2**16, 'move_ordering': MoveOrdering,
+                   'endgame': EndgameSolver, 'opening_book': book}
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -161,7 +304,8 @@ def main():
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
+                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student"),
+                   Agent(MCTSPlayer(playout=mobility_playout), "MCTS")]
 
     print(DESCRIPTION)
     for agentUT in test_agents:
@@ -171,7 +315,7 @@ def main():
         print("*************************")
 
         agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        win_ratio = play_round(agents, NUM_MATCHES, processes, seed, sprt)
 
         print("\n\nResults:")
         print("----------")
@@ -179,4 +323,21 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help="Number of worker processes used to play matches in parallel " +
+                        "(at most one per available CPU).")
+    parser.add_argument('-s', '--seed', type=int, default=None,
+                        help="Seed for the random opening moves of the matches, for " +
+                        "reproducible rounds.")
+    parser.add_argument('--sprt', nargs=2, type=float, metavar=('ELO0', 'ELO1'), default=None,
+                        help="Stop each pairing as soon as a sequential probability ratio " +
+                        "test decides between the agent under test being ELO0 or ELO1 " +
+                        "Elo points stronger than its opponent (e.g., --sprt -50 50); " +
+                        "NUM_MATCHES then is the maximum number of matches per initiative.")
+    parser.add_argument('--book', default=None,
+                        help="Opening book file (see opening_book.py) used by the " +
+                        "iterative deepening agents.")
+    args = parser.parse_args()
+    sprt = None if args.sprt is None else lambda: SPRT(*args.sprt)
+    main(args.processes, args.seed, sprt, args.book)
@@ -0,0 +1,111 @@
+"""
+This file contains test cases for the round-robin tournament runner in
+`tournament.py`.
+"""
+import io
+import random
+import unittest
+
+from contextlib import redirect_stdout
+
+import tournament
+
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer
+from sample_players import improved_score
+from tournament import Agent
+from rating import SPRT
+from rating import elo_ratings
+from rating import expected_score
+
+
+def make_agents():
+    return [Agent(RandomPlayer(), "Random"),
+            Agent(CustomPlayer(search_depth=2, score_fn=improved_score,
+                               method="alphabeta", iterative=False), "AB_Improved"),
+            Agent(RandomPlayer(), "Random_2")]
+
+
+class PlayRoundTest(unittest.TestCase):
+
+    def test_match_tasks(self):
+        """ every opponent plays num_matches matches with each initiative """
+        tasks = tournament.match_tasks(make_agents(), 2, seed=10)
+        self.assertEqual(len(tasks), 8)
+        self.assertEqual([task[3] for task in tasks], list(range(10, 18)))
+        self.assertEqual(tasks[:4], [(0, 2, 0, 10), (0, 0, 2, 11),
+                                     (0, 2, 0, 12), (0, 0, 2, 13)])
+        self.assertEqual([task[3] for task in tournament.match_tasks(make_agents(), 1)],
+                         [None] * 4)
+
+    def test_seeded_results(self):
+        """ seeded matches have the same results serially and in parallel """
+        agents = make_agents()
+        tasks = tournament.match_tasks(agents, 2, seed=3)
+        serial = list(tournament.play_tasks(agents, tasks, 1))
+        parallel = list(tournament.play_tasks(agents, tasks, 2))
+        self.assertEqual(serial, parallel)
+        for result in serial:
+            self.assertEqual(sum(result.wins), 2)
+            self.assertEqual(result.timeouts, (0, 0))
+            self.assertEqual(sum(result.wins), sum(result.invalid_moves))
+
+    def test_sprt_stops_pairing(self):
+        """ a pairing stops once the SPRT decides """
+        agents = [Agent(RandomPlayer(), "Random"),
+                  Agent(CustomPlayer(search_depth=3, score_fn=improved_score,
+                                     method="alphabeta", iterative=False), "AB_Improved")]
+        tests = []
+
+        def sprt():
+            tests.append(SPRT(-100., 100., 0.2, 0.2))
+            return tests[-1]
+
+        with redirect_stdout(io.StringIO()) as output:
+            tournament.play_round(agents, 20, seed=0, sprt=sprt)
+        self.assertEqual(tests[0].decision, SPRT.H1)
+        self.assertLess(tests[0].wins + tests[0].losses, 80)
+        self.assertIn("SPRT: stronger", output.getvalue())
+        self.assertIn("Elo Ratings", output.getvalue())
+
+
+class RatingTest(unittest.TestCase):
+
+    def simulate(self, elos, games, rng):
+        results = []
+        for i in range(len(elos)):
+            for j in range(i + 1, len(elos)):
+                p = expected_score(elos[i] - elos[j])
+                wins = sum(rng.random() < p for _ in range(games))
+                results.append((i, j, wins, games - wins))
+        return results
+
+    def test_elo_ratings(self):
+        """ the ratings recover the Elo differences of simulated games """
+        elos = [0., 150., -100., 300.]
+        ratings = elo_ratings(self.simulate(elos, 300, random.Random(0)), len(elos))
+        self.assertEqual(ratings[0], (0., 0.))
+        for elo, (rating, interval) in zip(elos[1:], ratings[1:]):
+            self.assertLess(abs(elo - rating), interval)
+            self.assertLess(interval, 60.)
+
+    def test_perfect_scores(self):
+        """ the prior keeps ratings finite, and unconnected agents are unrated """
+        ratings = elo_ratings([(0, 1, 0, 10)], 3)
+        self.assertGreater(ratings[1][0], 0.)
+        self.assertLess(ratings[1][0], 1000.)
+        self.assertEqual(ratings[2], (None, None))
+
+    def test_sprt(self):
+        """ the SPRT accepts the hypothesis closest to the simulated difference """
+        rng = random.Random(1)
+        for elo, expected in [(150., SPRT.H1), (-150., SPRT.H0)]:
+            test = SPRT()
+            while test.decision is None:
+                won = rng.random() < expected_score(elo)
+                test.update(int(won), int(not won))
+            self.assertEqual(test.decision, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""This file contains the transposition table used by `game_agent.CustomPlayer`
+to remember the results of searches across the iterations of iterative
+deepening (and across turns).
+
+Entries are keyed by the Zobrist hash of the game state (see
+`isolation.Board.zobrist_hash`) and stored in a fixed number of slots, so the
+memory used by the table is bounded no matter how long the agent runs.
+"""
+
+# Bound types of the stored scores
+EXACT = 0  # the score is the minimax value of the state
+LOWER = 1  # the search failed high; the minimax value is >= score
+UPPER = 2  # the search failed low; the minimax value is <= score
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results.
+
+    Each slot holds a single entry `(key, depth, bound, score, move, age)`.
+    When two states map to the same slot, the new entry replaces the old one
+    if the old entry was stored during an earlier search, or if the new
+    entry was searched at least as deep (depth-preferred replacement).
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots of the table.
+    """
+
+    def __init__(self, size=2**16):
+        self.size = size
+        self.slots = [None] * size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def new_search(self):
+        """Mark the entries stored so far as old so that they are the first
+        to be replaced by the results of the next search.
+        """
+        self.age += 1
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        self.slots = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """Look up the entry stored for a game state.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the game state.
+
+        Returns
+        -------
+        tuple(int, int, float, tuple(int, int)) or None
+            The (depth, bound, score, best move) stored for the game state,
+            or None if there is no entry for it.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """Store the result of searching a game state to a fixed depth,
+        unless the slot holds a deeper result of the current search.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the game state.
+
+        depth : int
+            The depth of the search that produced the result.
+
+        bound : {EXACT, LOWER, UPPER}
+            How the score relates to the minimax value of the game state.
+
+        score : float
+            The score returned by the search.
+
+        move : tuple(int, int)
+            The best move found by the search.
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            self.slots[index] = (key, depth, bound, score, move, self.age)
+            self.stores += 1
+
+    @property
+    def hit_rate(self):
+        """Fraction of probes that found an entry for the game state."""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.
+
+    def stats(self):
+        """Return the table counters as a dictionary."""
+        return {"size": self.size, "entries": len(self), "hits": self.hits,
+                "misses": self.misses, "stores": self.stores,
+                "hit_rate": self.hit_rate}